@@ -0,0 +1,358 @@
+# battle.py
+# Data-driven battle simulation shared by every fight (random encounters, Guardians, the King, the tutorial dummy).
+# A BattleEngine holds one fight's state and advances it with tick(dt, actions):
+#  - no drawing, printing, sleeping or global random state; what happened comes back as a list of events
+#  - randomness comes from the engine's own `rng` (combat) and `loot_rng` (drops), so seeded engines replay exactly
+#  - main.py draws the arena and turns events into messages/music; headless runs just call tick() in a loop
+# Events are (kind, text) tuples:
+#   'player_hit', 'enemy_hit', 'miss'  combat messages
+#   'phase'                            a boss trigger fired (see triggers.py)
+#   'music'                            switch to track `text`
+#   'victory', 'defeat'                the fight is over (see `outcome` and `rewards`)
+import random
+try:
+    from .occupancy import OccupancyGrid, footprint, footprint_distance
+    from .pathfinding import FlowField
+    from .scheduler import AIScheduler
+    from .triggers import TriggerSet, BOOST_STATS
+except Exception:
+    from occupancy import OccupancyGrid, footprint, footprint_distance
+    from pathfinding import FlowField
+    from scheduler import AIScheduler
+    from triggers import TriggerSet, BOOST_STATS
+
+# Arena size in cells
+BATTLE_WIDTH = 100
+BATTLE_HEIGHT = 50
+
+MOVE_DELAY = 0.10  # seconds between moves (player input is gated by key time, enemies by battle time)
+ATTACK_DELAY = 0.35  # seconds between player attacks
+INPUT_DELAYS = {'move': MOVE_DELAY, 'attack': ATTACK_DELAY}
+# Actions that share a cooldown, keyed to the group name used in gate_actions' `delays`
+INPUT_GATES = {'up': 'move', 'down': 'move', 'left': 'move', 'right': 'move', 'attack': 'attack'}
+ENEMY_ATTACK_INTERVAL = 0.06  # time between a speed-1 enemy's turns (roll to hit if adjacent, else step if its move is due)
+MAX_TICK = 0.25  # longest step one tick may simulate (time spent in menus or pauses is not fought through)
+
+MOVES = {'left': (-1, 0), 'right': (1, 0), 'up': (0, -1), 'down': (0, 1)}
+
+# Enemy templates. Optional keys:
+#  - per_level: stat increase per player level (the King scales with the player)
+#  - triggers: one-shot boss triggers (HP threshold, battle time, player position) and their effects, see triggers.py
+#  - think: seconds between the enemy's turns (default from its speed, see think_interval)
+ENEMY_TYPES = {
+    'Shadow': {
+        'HP': 30, 'attack': 8, 'defence': 3, 'speed': 1, 'size_width': 1, 'size_height': 1,
+        'sprite': ['◈','◇'], 'exp': 20, 'drop': 'potion', 'drop_chance': 50
+    },
+    'Guardian': {
+        'HP': 60, 'attack': 10, 'defence': 3, 'speed': 1, 'size_width': 1, 'size_height': 1,
+        'sprite': ['G'], 'exp': 10, 'drop': 'ancient_fragment', 'drop_chance': 100
+    },
+    'King': {
+        'HP': 2000, 'attack': 40, 'defence': 0, 'speed': 1, 'size_width': 2, 'size_height': 2,
+        'sprite': ['K','k'], 'exp': 500, 'drop': None,
+        'per_level': {'HP': 50, 'attack': 0.4},  # level 1 = 2050 HP / 40.4 attack, level 99 = 6950 / 79.6
+        'triggers': [
+            {'hp_below': 0.25, 'attack': 20, 'defence': 10, 'message': 'The King grows furious and enters Phase 2!', 'music': 'final2'}
+        ]
+    },
+    'Wisp': {
+        'HP': 6, 'attack': 6, 'defence': 0, 'speed': 1, 'size_width': 1, 'size_height': 1,
+        'sprite': ['·','∙'], 'exp': 1, 'drop': 'potion', 'drop_chance': 2
+    },
+    'Training Dummy': {
+        'HP': 20, 'attack': 0, 'defence': 0, 'speed': 0, 'size_width': 1, 'size_height': 1,
+        'sprite': ['◻'], 'exp': 0, 'drop': None, 'drop_chance': 0, 'think': 1.0
+    },
+}
+
+# Encounter definitions
+#  - enemies: spawn list; 'offset' is relative to the player's start cell (kept inside the arena), 'at' is absolute,
+#    'area' (left, top, right, bottom) scatters 'count' enemies over distinct free cells
+#  - swarm: run on the NumPy SwarmEngine (swarm.py), for fights with hundreds or thousands of enemies
+#  - obstacles (optional): (left, top, right, bottom) rectangles of arena cells nobody can enter
+#  - hit_chance: chance per enemy turn (see think_interval) that an adjacent enemy lands a hit
+#  - music: track to start the fight with; victory: message shown when every enemy is down
+ENCOUNTERS = {
+    'shadow': {
+        'enemies': [{'type': 'Shadow', 'offset': (2, 0)}],
+        'hit_chance': 0.15, 'music': 'battle', 'victory': 'You won the battle!'
+    },
+    'shadow_pair': {
+        'enemies': [{'type': 'Shadow', 'offset': (2, 0)}, {'type': 'Shadow', 'offset': (-2, 0)}],
+        'hit_chance': 0.15, 'music': 'battle', 'victory': 'You won the battle!'
+    },
+    'shadow_pack': {
+        'enemies': [{'type': 'Shadow', 'offset': (2, 0)}, {'type': 'Shadow', 'offset': (-2, 0)},
+                    {'type': 'Shadow', 'offset': (0, -3)}],
+        'hit_chance': 0.15, 'music': 'battle', 'victory': 'You won the battle!'
+    },
+    'wisps': {
+        'enemies': [{'type': 'Wisp', 'count': 12, 'area': (30, 20, 70, 40)}],
+        'hit_chance': 0.15, 'music': 'battle', 'victory': 'The wisps scatter!'
+    },
+    'guardian': {
+        'enemies': [{'type': 'Guardian', 'offset': (2, 0)}],
+        'hit_chance': 0.15, 'music': 'battle', 'victory': 'You defeated the Guardian!'
+    },
+    'king': {
+        'enemies': [{'type': 'King', 'offset': (4, 0)}],
+        'hit_chance': 0.22, 'music': 'final1', 'victory': 'You defeated the King! YOU WIN THE GAME!'
+    },
+    'swarm': {
+        'enemies': [{'type': 'Wisp', 'count': 500, 'area': (0, 0, BATTLE_WIDTH, BATTLE_HEIGHT // 2)}],
+        'swarm': True, 'hit_chance': 0.15, 'music': 'battle', 'victory': 'The swarm is gone!'
+    },
+    'training': {
+        'enemies': [{'type': 'Training Dummy', 'at': (30, 25)}],
+        'hit_chance': 0.0, 'music': None, 'victory': 'Dummy defeated! Tutorial complete. Returning to main menu...'
+    },
+}
+
+
+def spawn_enemy(type_name, level, x, y):
+    # Build a live enemy dict from its template, scaled to the player's level
+    template = ENEMY_TYPES[type_name]
+    enemy = {key: value for key, value in template.items() if key not in ('per_level', 'triggers')}
+    for stat, step in template.get('per_level', {}).items():
+        enemy[stat] = enemy[stat] + step * level
+    enemy['name'] = type_name
+    enemy['max_HP'] = enemy['HP']
+    enemy['triggers'] = list(template.get('triggers', []))
+    enemy['phase'] = 1
+    enemy['battle_x'] = x
+    enemy['battle_y'] = y
+    return enemy
+
+def obstacle_cells(encounter, width=BATTLE_WIDTH, height=BATTLE_HEIGHT):
+    # Set of arena cells covered by the encounter's obstacle rectangles
+    cells = set()
+    for left, top, right, bottom in encounter.get('obstacles', ()):
+        for y in range(max(0, top), min(height, bottom)):
+            for x in range(max(0, left), min(width, right)):
+                cells.add((x, y))
+    return cells
+
+def spawn_positions(spec, player_pos, width, height, rng, blocked=frozenset()):
+    # Anchor cells for one spawn list entry ('area' spawns get distinct cells that aren't blocked)
+    template = ENEMY_TYPES[spec['type']]
+    count = spec.get('count', 1)
+    if 'area' in spec:
+        left, top, right, bottom = spec['area']
+        free = [(x, y) for y in range(top, bottom) for x in range(left, right) if (x, y) not in blocked]
+        if len(free) < count:
+            raise ValueError(f"spawn area {spec['area']} has {len(free)} free cells for {count} {spec['type']}")
+        return rng.sample(free, count)
+    if 'at' in spec:
+        x, y = spec['at']
+    else:
+        dx, dy = spec.get('offset', (0, 0))
+        x = min(width - 1 - template.get('size_width', 1), player_pos['x'] + dx)
+        y = min(height - 1, player_pos['y'] + dy)
+    return [(x, y)] * count
+
+def drop_probability(drop_chance):
+    # drop_chance is a percentage (or a 0-1 probability)
+    return (drop_chance / 100.0) if drop_chance > 1 else float(drop_chance)
+
+def gate_actions(timed_actions, last_times, delays, gates=INPUT_GATES):
+    # Apply cooldowns (e.g. MOVE_DELAY/ATTACK_DELAY) using the key arrival times instead of loop timing
+    # Steps:
+    #  - An action in a gated group (`gates`: action -> group) is kept only if more than its delay passed since the last kept one
+    #  - Faster repeats (held-key autorepeat, double taps) are coalesced away
+    #  - `last_times` remembers the last kept time per group between frames
+    accepted = []
+    for stamp, action in timed_actions:
+        group = gates.get(action)
+        delay = delays.get(group) if group else None
+        if delay is not None:
+            last = last_times.get(group)
+            if last is not None and stamp - last <= delay:
+                continue
+            last_times[group] = stamp
+        accepted.append(action)
+    return accepted
+
+def create_engine(encounter, player, rng=None, width=BATTLE_WIDTH, height=BATTLE_HEIGHT, loot_rng=None):
+    # Engine for an encounter: swarm encounters use the NumPy SwarmEngine, everything else BattleEngine
+    definition = ENCOUNTERS[encounter] if isinstance(encounter, str) else encounter
+    if definition.get('swarm'):
+        try:
+            from .swarm import SwarmEngine
+        except Exception:
+            from swarm import SwarmEngine
+        return SwarmEngine(definition, player, rng, width, height, loot_rng)
+    return BattleEngine(definition, player, rng, width, height, loot_rng)
+
+def move_interval(speed):
+    # Seconds between an enemy's steps: `speed` steps per MOVE_DELAY; None for enemies that never move (speed 0)
+    return MOVE_DELAY / speed if speed > 0 else None
+
+def think_interval(enemy):
+    # Seconds between an enemy's turns: the template's 'think' if it has one, else ENEMY_ATTACK_INTERVAL divided by
+    # its speed (faster enemies act more often); enemies that never move keep the base interval so they can still hit
+    if enemy.get('think'):
+        return enemy['think']
+    speed = enemy.get('speed', 1)
+    return ENEMY_ATTACK_INTERVAL / speed if speed > 0 else ENEMY_ATTACK_INTERVAL
+
+def distance(enemy, pos):
+    # Manhattan distance from a battle position to the closest cell an enemy covers (its whole size, not just the anchor)
+    return footprint_distance(enemy, pos['x'], pos['y'])
+
+
+class BattleEngine:
+    def __init__(self, encounter, player, rng=None, width=BATTLE_WIDTH, height=BATTLE_HEIGHT, loot_rng=None):
+        # 1) `encounter` is an ENCOUNTERS key or a definition dict; `player` is the player's PlayerStats (HP is changed in place).
+        #    `rng` drives spawns and hit rolls, `loot_rng` the drop rolls (defaults to `rng`).
+        # 2) The player starts bottom-centre; enemies spawn per the encounter's spawn list.
+        # 3) `grid` records every cell each living enemy covers (collision, adjacency and targeting queries).
+        # 4) `field` is the shared flow field enemies follow to the player, around `obstacles`.
+        # 5) `ai` schedules each enemy's thinking on its own timer (first turns spread over one interval);
+        #    `ai_budget` caps the real seconds enemy AI may take per tick (None = no cap, deterministic).
+        # 6) `triggers` holds the enemies' boss triggers, checked only where their watched value changes.
+        self.encounter = ENCOUNTERS[encounter] if isinstance(encounter, str) else encounter
+        self.player = player
+        self.rng = rng or random.Random()
+        self.loot_rng = loot_rng or self.rng
+        self.width = width
+        self.height = height
+        self.player_pos = {'x': width // 2, 'y': height - 2}
+        self.enemies = []
+        self.grid = OccupancyGrid(width, height)
+        self.obstacles = obstacle_cells(self.encounter, width, height)
+        self.field = FlowField(width, height, self.obstacles)
+        level = player.Level
+        for spec in self.encounter['enemies']:
+            for x, y in spawn_positions(spec, self.player_pos, width, height, self.rng, self.obstacles):
+                enemy = spawn_enemy(spec['type'], level, x, y)
+                enemy['next_move'] = 0.0
+                self.enemies.append(enemy)
+                self.grid.add(enemy)
+        self.ai = AIScheduler()
+        self.ai_budget = None
+        self.triggers = TriggerSet()
+        for enemy in self.enemies:
+            for trigger in enemy['triggers']:
+                self.triggers.add(enemy, trigger)
+        for enemy in self.enemies:
+            self.ai.add(enemy, self.rng.random() * think_interval(enemy))
+        self.time = 0.0
+        self.outcome = None  # 'victory' or 'defeat' once the fight is over
+        self.rewards = []    # (enemy name, exp, dropped item or None, item count) after a victory
+
+    def alive_enemies(self):
+        return [e for e in self.enemies if e['HP'] > 0]
+
+    def nearest_enemy(self):
+        # Living enemy closest to the player, or None
+        return self.grid.nearest(self.player_pos['x'], self.player_pos['y'])[0]
+
+    # --- Update ---
+    def tick(self, dt, actions=()):
+        # Advance the fight by `dt` seconds with this frame's player actions (already rate limited); return events
+        # Steps:
+        #  - Apply player moves and attacks in order
+        #  - Run every enemy whose turn is due (whether or not keys were pressed): adjacent ones roll to hit, others chase
+        #  - Fire time triggers that came due (HP and position triggers fire where damage/moves happen)
+        #  - Check for victory or defeat
+        events = []
+        if self.outcome is not None:
+            return events
+        dt = max(0.0, min(dt, MAX_TICK))
+        self.time += dt
+        for action in actions:
+            if action in MOVES:
+                self._move_player(action, events)
+            elif action == 'attack':
+                self._player_attack(events)
+        self._enemy_turn(events)
+        self._fire(self.triggers.elapsed(self.time), events)
+        self._check_end(events)
+        return events
+
+    def _move_player(self, action, events):
+        # Step one cell, clamped to the arena; stepping onto an enemy or obstacle is blocked
+        dx, dy = MOVES[action]
+        pos = self.player_pos
+        nx = max(0, min(self.width - 1, pos['x'] + dx))
+        ny = max(0, min(self.height - 1, pos['y'] + dy))
+        if not self.grid.blocked(nx, ny) and (nx, ny) not in self.obstacles:
+            pos['x'], pos['y'] = nx, ny
+            self._fire(self.triggers.moved(nx, ny), events)
+
+    def _player_attack(self, events):
+        # Hit the closest enemy touching the player's cell or one of its 4 neighbours
+        if not self.grid.members:
+            return
+        adjacent = self.grid.near(self.player_pos['x'], self.player_pos['y'], 1)
+        if adjacent:
+            target = adjacent[0]
+            dmg = max(0, self.player.effective_attack - target.get('defence', 0))
+            target['HP'] -= dmg
+            if target['HP'] <= 0:
+                self.grid.remove(target)
+            events.append(('player_hit', f"You hit {target['name']} for {dmg}!"))
+            self._fire(self.triggers.damaged(target), events)
+        else:
+            events.append(('miss', "Enemy is too far to attack!"))
+
+    def _enemy_turn(self, events):
+        # Give each due enemy its turn (see AIScheduler); each turn:
+        #  - an enemy next to the player rolls once to hit
+        #  - otherwise it takes the flow-field steps its speed allows since its last move
+        # Turns come every think_interval(enemy) (rechecked each turn, so speed boosts apply); a backlog (long tick,
+        # budget cut) is capped at MAX_TICK.
+        pos = self.player_pos
+        self.field.update(pos['x'], pos['y'])
+        hit_chance = self.encounter.get('hit_chance', 0.0)
+
+        def think(e, due):
+            if e['HP'] <= 0:
+                return None
+            if footprint_distance(e, pos['x'], pos['y']) <= 1:
+                if self.rng.random() < hit_chance:
+                    dmg = max(0, e['attack'] - self.player.effective_defence)
+                    self.player.HP -= dmg
+                    events.append(('enemy_hit', f"{e['name']} hits you for {dmg}!"))
+            else:
+                interval = move_interval(e['speed'])
+                if interval is not None:
+                    taken = lambda cx, cy: any(other is not e for cell in footprint(e, cx, cy) for other in self.grid.at(*cell))
+                    e['next_move'] = max(e['next_move'], due - MOVE_DELAY)
+                    x, y = e['battle_x'], e['battle_y']
+                    while e['next_move'] <= due:
+                        e['next_move'] += interval
+                        x, y = self.field.next_step(x, y, e['size_width'], e['size_height'], taken)
+                    if (x, y) != (e['battle_x'], e['battle_y']):
+                        self.grid.move(e, x, y)
+            return max(due + think_interval(e), self.time - MAX_TICK)
+
+        self.ai.run(self.time, think, self.ai_budget)
+
+    def _fire(self, fired, events):
+        # Apply the effects of triggers that just fired: stat boosts, next phase, message and music
+        for e, trigger in fired:
+            e['phase'] += 1
+            for stat in BOOST_STATS:
+                e[stat] += trigger.get(stat, 0)
+            if trigger.get('message'):
+                events.append(('phase', trigger['message']))
+            if trigger.get('music'):
+                events.append(('music', trigger['music']))
+
+    def _check_end(self, events):
+        if not self.grid.members:
+            self.outcome = 'victory'
+            self.rewards = [self._roll_reward(e) for e in self.enemies]
+            events.append(('victory', self.encounter.get('victory', 'You won the battle!')))
+        elif self.player.HP <= 0:
+            self.outcome = 'defeat'
+            events.append(('defeat', 'You died...'))
+
+    def _roll_reward(self, enemy):
+        # (name, exp, drop, count) for a defeated enemy
+        drop = enemy.get('drop')
+        if drop and self.loot_rng.random() >= drop_probability(enemy.get('drop_chance', 50)):
+            drop = None
+        return enemy['name'], enemy.get('exp', 0), drop, 1 if drop else 0
@@ -0,0 +1,93 @@
+# encounters.py
+# Random field encounters, per map region.
+# Each region has an encounter rate per step and weighted enemy groups (ENCOUNTERS keys in battle.py).
+# The tables are compiled once into alias tables (Vose's method) where "no encounter" is just another outcome,
+# so a step's encounter check and group pick is a single O(1) draw however many regions and groups there are.
+# A map's region layer is also built once (one byte per cell), so looking up the player's region is O(1) too.
+
+# Regions come from the map art under each cell: blank ground is open, solid blocks are dense, everything else rough
+REGION_NAMES = ["open", "rough", "dense"]
+REGION_CODES = {name: code for code, name in enumerate(REGION_NAMES)}
+REGION_GLYPHS = {'⠀': "open", ' ': "open", '⣿': "dense"}
+DEFAULT_REGION = "rough"
+
+# rate: chance per step of a fight; groups: ENCOUNTERS key -> relative weight
+ENCOUNTER_TABLES = {
+    'open': {'rate': 0.03, 'groups': {'shadow': 6, 'shadow_pair': 3, 'wisps': 1}},
+    'rough': {'rate': 0.05, 'groups': {'shadow': 4, 'shadow_pair': 4, 'shadow_pack': 1, 'wisps': 2}},
+    'dense': {'rate': 0.08, 'groups': {'shadow_pair': 3, 'shadow_pack': 3, 'wisps': 2}},
+}
+
+
+class AliasTable:
+    def __init__(self, outcomes, weights):
+        # Vose's alias method: column i keeps outcome i with probability prob[i], else gives outcome alias[i]
+        # Steps:
+        #  - Scale weights so they average 1, split columns into small (< 1) and large (>= 1)
+        #  - Fill each small column's remainder with a large outcome, which shrinks by that amount
+        #  - Leftover columns (rounding) keep their own outcome
+        total = float(sum(weights))
+        if not outcomes or total <= 0:
+            raise ValueError("alias table needs at least one positive weight")
+        n = len(outcomes)
+        self.outcomes = list(outcomes)
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        scaled = [weight * n / total for weight in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+
+    def sample(self, rng):
+        # One outcome in O(1): pick a column, then the column's own outcome or its alias
+        column = rng.randrange(len(self.prob))
+        return self.outcomes[column if rng.random() < self.prob[column] else self.alias[column]]
+
+
+class EncounterTables:
+    def __init__(self, tables=ENCOUNTER_TABLES):
+        # One AliasTable per region over [None (no fight), group, group, ...]
+        self.tables = {}
+        for region, table in tables.items():
+            rate = table['rate']
+            groups = table['groups']
+            group_total = float(sum(groups.values()))
+            outcomes = [None] + list(groups)
+            weights = [1.0 - rate] + [rate * weight / group_total for weight in groups.values()]
+            self.tables[region] = AliasTable(outcomes, weights)
+
+    def roll(self, region, rng):
+        # Encounter group for one step in `region` (ENCOUNTERS key), or None for no fight
+        table = self.tables.get(region) or self.tables.get(DEFAULT_REGION)
+        return table.sample(rng) if table else None
+
+
+class RegionMap:
+    def __init__(self, width, height, cells=None):
+        # One region code per map cell, laid out row by row like TileGrid
+        self.width = width
+        self.height = height
+        self.cells = cells if cells is not None else bytearray(width * height)
+
+    @classmethod
+    def from_map(cls, rows, glyphs=REGION_GLYPHS):
+        # Classify every cell of the map art once (rows can be lists of strings or a GlyphLayer)
+        height = len(rows)
+        width = getattr(rows, 'width', None) or max((len(row) for row in rows), default=0)
+        regions = cls(width, height)
+        default = REGION_CODES[DEFAULT_REGION]
+        codes = {ch: REGION_CODES[name] for ch, name in glyphs.items()}
+        for y in range(height):
+            row = rows[y]
+            regions.cells[y * width:y * width + len(row)] = bytes(codes.get(ch, default) for ch in row)
+        return regions
+
+    def region_at(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return REGION_NAMES[self.cells[y * self.width + x]]
+        return DEFAULT_REGION
@@ -0,0 +1,138 @@
+# inventory.py
+# Player inventory: item stacks indexed by name.
+# Stacks live in a dict keyed by item name, so finding, stacking onto and removing a stack are O(1) instead of
+# scanning a list. Dicts keep insertion order, which is the slot order shown in the Items menu and used by the
+# 1/2/3 quick slots; removing a stack moves the later ones up a slot, just like popping it from the old list.
+# Saves keep the old shape: a list of {'name': str, 'count': int}.
+# ITEMS and use_item() (item effects) live here too, so the simulator can use items without loading the game UI.
+from itertools import islice
+
+# Items database (global)
+ITEMS = {
+    'potion': {'heal': 100},
+    'hi-potion': {'heal': 500},
+    'x-potion': {'heal': 1000},
+    'elixir': {'heal': 9999},
+    # Special ultimate item (non-consumable)
+    'Ancient Cypher': {'level': 99, 'consumable': False}
+}
+
+
+class Inventory:
+    def __init__(self, stacks=()):
+        # `stacks`: {'name', 'count'} dicts in slot order (e.g. a save's inventory list); repeated names are merged
+        self.stacks = {}
+        for stack in stacks:
+            self.add(stack['name'], stack.get('count', 1))
+
+    # --- Stacks ---
+    def add(self, name, qty=1):
+        # Add to the existing stack, or start a new one in the last slot
+        stack = self.stacks.get(name)
+        if stack is not None:
+            stack['count'] += qty
+        else:
+            self.stacks[name] = {'name': name, 'count': qty}
+
+    def remove(self, name, qty=1):
+        # Take `qty` from a stack, dropping the stack once it runs out; False if there is no such item
+        stack = self.stacks.get(name)
+        if stack is None:
+            return False
+        if stack['count'] > qty:
+            stack['count'] -= qty
+        else:
+            del self.stacks[name]
+        return True
+
+    def get(self, name):
+        # The {'name', 'count'} stack for `name`, or None
+        return self.stacks.get(name)
+
+    def count(self, name):
+        stack = self.stacks.get(name)
+        return stack['count'] if stack else 0
+
+    def replace(self, stacks):
+        # Swap in another inventory's stacks in place (loading a save), so everyone holding this object sees them
+        self.stacks.clear()
+        for stack in stacks:
+            self.add(stack['name'], stack.get('count', 1))
+
+    # --- Slots ---
+    def slot_name(self, slot):
+        # Item name in slot `slot` (0-based), or None; quick slots are the first three, so the walk is short
+        if 0 <= slot < len(self.stacks):
+            return next(islice(self.stacks, slot, None))
+        return None
+
+    def __getitem__(self, slot):
+        # Stack in slot `slot`, like indexing the old list
+        if slot < 0:
+            slot += len(self.stacks)
+        if not 0 <= slot < len(self.stacks):
+            raise IndexError("inventory slot out of range")
+        return next(islice(self.stacks.values(), slot, None))
+
+    def __len__(self):
+        return len(self.stacks)
+
+    def __iter__(self):
+        return iter(self.stacks.values())
+
+    def __contains__(self, name):
+        return name in self.stacks
+
+    # --- Save format ---
+    def to_json(self):
+        return [dict(stack) for stack in self.stacks.values()]
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data or [])
+
+    def __repr__(self):
+        return f"Inventory({self.to_json()})"
+
+
+# --- Items / usage ---
+def use_item(player_stats, inventory, item_name, items_db=None, report=None):
+    # Find item in inventory, apply effect (heal/level), remove if consumable, return success status
+    # report(message) is called with what happened (main passes show(); the simulator passes nothing)
+    items_db = items_db or ITEMS
+    report = report or (lambda message: None)
+    # Inventory stacks: {'name': str, 'count': int}, looked up by name
+    entry = inventory.get(item_name)
+    if not entry:
+        report("You don't have that item.")
+        return False
+    item_info = items_db.get(item_name)
+    if not item_info:
+        report(f"Unknown item: {item_name}")
+        return False
+
+    # Apply healing effect (capped at max HP)
+    if 'heal' in item_info:
+        heal_amount = item_info['heal']
+        previous_hp = player_stats.get('HP', 0)
+        max_hp = player_stats.get('max_hp', previous_hp)
+        new_hp = min(previous_hp + heal_amount, max_hp)
+        actual_healing_done = new_hp - previous_hp
+        player_stats['HP'] = new_hp
+        report(f"Used {item_name}. Healed {actual_healing_done} HP (HP: {previous_hp} -> {player_stats['HP']})")
+
+    # Level set / ancient power
+    # Apply level-setting effect (e.g., Ancient Cypher)
+    elif 'level' in item_info:
+        previous_level = player_stats.get('Level', 1)
+        player_stats['Level'] = item_info['level']
+        report(f"Used {item_name}. Level: {previous_level} -> {player_stats['Level']}")
+
+    else:
+        report(f"Used {item_name}.")
+
+    # Remove from inventory if consumable (non-consumable items persist)
+    is_consumable = item_info.get('consumable', True)
+    if is_consumable:
+        inventory.remove(item_name, 1)
+    return True
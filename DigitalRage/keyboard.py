@@ -0,0 +1,286 @@
+# keyboard.py
+# Keyboard backends that wait for a key (or a deadline) instead of busy polling.
+# read_key(timeout) returns a key name or None when the deadline passes:
+#  - printable keys as their character ('w', ' ', '1', '+', ...)
+#  - 'up', 'down', 'left', 'right', 'enter', 'esc'
+# timeout=None waits forever, timeout=0 only checks for a key that is already waiting.
+# interrupt() (from another thread) makes a waiting read_key return None, where the backend can do that.
+# EOFError is raised once the input stream is closed.
+# InputQueue reads keys on a background thread and stamps each with its arrival time.
+import os
+import sys
+import time
+import atexit
+import threading
+from collections import deque, namedtuple
+from contextlib import contextmanager
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+try:
+    import termios
+    import select
+except ImportError:
+    termios = None
+
+SPECIAL_KEYS = {b'\r': 'enter', b'\n': 'enter', b'\x1b': 'esc'}
+
+
+def _key_name(key):
+    # Single byte -> key name
+    return SPECIAL_KEYS.get(key) or key.decode("latin-1")
+
+
+class WindowsKeyboard:
+    # msvcrt console input: arrows arrive as a \xe0 (or \x00) prefix plus a scan code
+    ARROWS = {b'H': 'up', b'P': 'down', b'K': 'left', b'M': 'right'}
+    POLL_INTERVAL = 0.005  # console input can't be select()ed; short naps only while a deadline is pending
+    INTERRUPTIBLE = False  # a blocking getch() can't be woken, so line prompts must read keys from the InputQueue
+
+    def read_key(self, timeout=0):
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+            while not msvcrt.kbhit():
+                if time.monotonic() >= deadline:
+                    return None
+                time.sleep(self.POLL_INTERVAL)
+        # With no deadline getch() blocks inside the console API without using CPU
+        key = msvcrt.getch()
+        if key in (b'\xe0', b'\x00'):
+            return self.ARROWS.get(msvcrt.getch())
+        return _key_name(key)
+
+    @contextmanager
+    def suspend(self):
+        # Console already line-buffers input() on Windows
+        yield
+
+    def interrupt(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class PosixKeyboard:
+    # termios + select: the terminal is put in non-canonical, no-echo mode and reads block in select()
+    # until a key arrives or the deadline passes. Arrow keys are decoded from their escape sequences.
+    # select() also watches a wake-up pipe, so interrupt() can end a read that has no deadline.
+    CSI_ARROWS = {ord('A'): 'up', ord('B'): 'down', ord('C'): 'right', ord('D'): 'left'}
+    ESCAPE_TIMEOUT = 0.02  # how long to wait for the rest of an escape sequence before treating ESC as a key
+    INTERRUPTIBLE = True
+
+    def __init__(self, fd=None):
+        # stdin's fd is looked up on first use, so creating the keyboard works without a terminal (tests, piped runs)
+        self._fd = fd
+        self._saved_mode = None
+        self._pending = bytearray()
+        self._wake_read, self._wake_write = os.pipe()
+        atexit.register(self.restore)
+
+    @property
+    def fd(self):
+        if self._fd is None:
+            self._fd = sys.stdin.fileno()
+        return self._fd
+
+    # --- Terminal mode ---
+    def _enter_raw(self):
+        # Switch off line buffering and echo (output processing stays on so print() still works)
+        if self._saved_mode is not None or not os.isatty(self.fd):
+            return
+        self._saved_mode = termios.tcgetattr(self.fd)
+        mode = termios.tcgetattr(self.fd)
+        mode[3] &= ~(termios.ICANON | termios.ECHO)
+        mode[6][termios.VMIN] = 1
+        mode[6][termios.VTIME] = 0
+        termios.tcsetattr(self.fd, termios.TCSANOW, mode)
+
+    def restore(self):
+        # Put the terminal back the way we found it
+        if self._saved_mode is not None:
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self._saved_mode)
+            self._saved_mode = None
+
+    @contextmanager
+    def suspend(self):
+        # Normal line input (e.g. input() prompts); raw mode comes back on the next read_key()
+        self.restore()
+        yield
+
+    def interrupt(self):
+        # Wake a read_key() blocked in select() (it returns None)
+        if self._wake_write is not None:
+            os.write(self._wake_write, b'x')
+
+    def close(self):
+        # Restore the terminal and release the wake-up pipe (no read_key() may be waiting by now)
+        self.restore()
+        if self._wake_write is not None:
+            os.close(self._wake_read)
+            os.close(self._wake_write)
+            self._wake_read = self._wake_write = None
+
+    # --- Reading ---
+    def _fill(self, timeout, wake=False):
+        # Wait up to `timeout` for input and append whatever is available; return False on timeout
+        # (or when `wake` is set and interrupt() was called)
+        readable, _, _ = select.select([self.fd, self._wake_read] if wake else [self.fd], [], [], timeout)
+        if self._wake_read in readable:
+            os.read(self._wake_read, 64)
+        if self.fd not in readable:
+            return False
+        data = os.read(self.fd, 64)
+        if not data:
+            # stdin closed: waiting again would spin, so stop the game's input loop instead
+            raise EOFError("keyboard input closed")
+        self._pending += data
+        return True
+
+    def read_key(self, timeout=0):
+        self._enter_raw()
+        if not self._pending and not self._fill(timeout, wake=True):
+            return None
+        return self._decode()
+
+    def _decode(self):
+        # Take one key off the front of the pending bytes
+        first = self._pending[0]
+        if first != 0x1b:
+            del self._pending[0]
+            return _key_name(bytes([first]))
+        if len(self._pending) == 1:
+            self._fill(self.ESCAPE_TIMEOUT)
+        if len(self._pending) < 2 or self._pending[1] not in (ord('['), ord('O')):
+            del self._pending[0]
+            return 'esc'
+        # ESC [ <params> <final> or ESC O <final>: read up to the final byte (0x40-0x7e)
+        end = 2
+        while True:
+            while end >= len(self._pending):
+                if not self._fill(self.ESCAPE_TIMEOUT):
+                    del self._pending[:end]
+                    return None
+            if 0x40 <= self._pending[end] <= 0x7e:
+                break
+            end += 1
+        final = self._pending[end]
+        del self._pending[:end + 1]
+        # Unknown sequences (function keys, ...) are swallowed
+        return self.CSI_ARROWS.get(final)
+
+
+# A key press and the monotonic time it arrived
+InputEvent = namedtuple("InputEvent", "time key")
+
+
+class InputQueue:
+    # Background key reader: every key is queued with the time it arrived, so a game loop that was busy
+    # (drawing, sleeping after a hit message...) can still process a burst of keys at the rate it was typed.
+    # The reader blocks in read_key() with no deadline; suspend() and close() wake it with keyboard.interrupt().
+
+    def __init__(self, keyboard, clock=time.monotonic):
+        # The reader thread starts on first use, so creating a queue has no side effects
+        self.keyboard = keyboard
+        self.clock = clock
+        self._events = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._paused = False
+        self._reading = False
+        self._eof = False
+        self._closed = False
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="input", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._paused and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                self._reading = True
+            try:
+                key = self.keyboard.read_key(None)
+                stamp = self.clock()
+            except EOFError:
+                with self._cond:
+                    self._eof = True
+                    self._reading = False
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._reading = False
+                if key is not None:
+                    self._events.append(InputEvent(stamp, key))
+                self._cond.notify_all()
+
+    # --- Consumer side ---
+    def poll(self, timeout=0):
+        # Return the oldest queued event, waiting up to `timeout` (None = forever); None if nothing arrived
+        self._start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._events:
+                if self._eof:
+                    raise EOFError("keyboard input closed")
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return self._events.popleft()
+
+    def drain(self):
+        # Take every queued event (oldest first) without waiting
+        self._start()
+        with self._cond:
+            events = list(self._events)
+            self._events.clear()
+            return events
+
+    @property
+    def suspendable(self):
+        # False when the keyboard can't wake a blocked read (Windows): suspend() would wait for the next key press
+        return self.keyboard.INTERRUPTIBLE
+
+    @contextmanager
+    def suspend(self):
+        # Stop reading keys (e.g. while input() owns the terminal), then resume afterwards
+        with self._cond:
+            self._paused = True
+            if self._reading:
+                self.keyboard.interrupt()
+            while self._reading:
+                self._cond.wait()
+        try:
+            with self.keyboard.suspend():
+                yield
+        finally:
+            with self._cond:
+                self._paused = False
+                self._cond.notify_all()
+
+    def close(self):
+        # Stop the reader, then close the keyboard; a backend that can't be interrupted is left to its daemon thread
+        with self._cond:
+            self._closed = True
+            if self._reading:
+                self.keyboard.interrupt()
+            self._cond.notify_all()
+            while self._reading and self.keyboard.INTERRUPTIBLE:
+                self._cond.wait()
+        self.keyboard.close()
+
+
+def get_keyboard():
+    # Pick the backend for this platform
+    if msvcrt is not None:
+        return WindowsKeyboard()
+    if termios is not None:
+        return PosixKeyboard()
+    raise RuntimeError("No keyboard backend available (need msvcrt or termios)")
@@ -1,63 +1,115 @@
 # BB 1st Final Project, The Fight Beyond Death: Text Adventure
 
 #SETUP
-#- Import libraries: os, time, winsound, mscrt, save (My Save File), music controller (music playback)
+#- Import libraries: os, time, winsound, keyboard (msvcrt/termios input), save (My Save File), music controller (music playback), renderer (screen output)
 import os
 import time
-import random
-import msvcrt
+import shutil
 import json
 try:
     from .music_controller import MusicController
 except Exception:
     from music_controller import MusicController
 try:
-    from .maps import map1
+    from .map_compiler import load_world
 except Exception:
-    from maps import map1
+    from map_compiler import load_world
+try:
+    from .renderer import TerminalRenderer, ThreadedRenderer
+except Exception:
+    from renderer import TerminalRenderer, ThreadedRenderer
+try:
+    from .recording import CastRecorder
+except Exception:
+    from recording import CastRecorder
+try:
+    from .keyboard import get_keyboard, InputQueue
+except Exception:
+    from keyboard import get_keyboard, InputQueue
+try:
+    from .tile_grid import TileGrid
+except Exception:
+    from tile_grid import TileGrid
+try:
+    from .battle import BattleEngine, create_engine, gate_actions, BATTLE_WIDTH, BATTLE_HEIGHT, INPUT_DELAYS, MOVES
+except Exception:
+    from battle import BattleEngine, create_engine, gate_actions, BATTLE_WIDTH, BATTLE_HEIGHT, INPUT_DELAYS, MOVES
+try:
+    from .player import PlayerStats, level_stats, level_for_exp
+except Exception:
+    from player import PlayerStats, level_stats, level_for_exp
+try:
+    from .rng import RandomStreams
+except Exception:
+    from rng import RandomStreams
+try:
+    from .messages import MessageLog
+except Exception:
+    from messages import MessageLog
+try:
+    from .encounters import EncounterTables, RegionMap
+except Exception:
+    from encounters import EncounterTables, RegionMap
+try:
+    from .inventory import Inventory, ITEMS, use_item as apply_item
+except Exception:
+    from inventory import Inventory, ITEMS, use_item as apply_item
 
 SAVE_FILE = "save.json"
-
-# Items database (global)
-ITEMS = {
-    'potion': {'heal': 100},
-    'hi-potion': {'heal': 500},
-    'x-potion': {'heal': 1000},
-    'elixir': {'heal': 9999},
-    # Special ultimate item (non-consumable)
-    'Ancient Cypher': {'level': 99, 'consumable': False}
-}
-
-# Battle grid defaults
-BATTLE_WIDTH = 100
-BATTLE_HEIGHT = 50
+# Game randomness: separate seeded streams for random encounters, combat rolls and loot (see rng.py).
+# Seeded from --seed for a reproducible run; saved and restored with the game.
+RNG = RandomStreams()
+
+# Field camera: draw only a terminal-sized window around the player (False = whole map every frame)
+CAMERA_MODE = True
+# The window stays put while the player is at least this fraction of its width/height from every edge and
+# re-centers once they get closer, so walking only redraws the whole map every few screens instead of every step
+CAMERA_MARGIN = 0.2
+MESSAGE_LOG_LINES = 3  # message log lines drawn under the map and the battle arena
+MAP_UI_LINES = 5 + MESSAGE_LOG_LINES  # lines under the map for identifiers, stats, controls and messages
+MAP_FLOOR_GLYPH = '⠀'  # blank braille cell used for open ground
+
+# Active output backend (see renderer.py); swap with set_renderer() to run headless or capture frames.
+# Terminal writes happen on a render thread with a small frame queue, so a slow console can't delay input or AI.
+RENDERER = ThreadedRenderer(TerminalRenderer())
+
+def set_renderer(renderer):
+    # Route all drawing to `renderer`; return the previous one so callers can restore it
+    global RENDERER
+    previous = RENDERER
+    RENDERER = renderer
+    return previous
+
+# Random encounter tables per map region, compiled once into O(1) alias tables (see encounters.py)
+ENCOUNTER_TABLES = EncounterTables()
+
+# Recent combat/level-up/reward messages; each frame draws the ones that haven't expired yet (see messages.py)
+MESSAGES = MessageLog(MESSAGE_LOG_LINES)
+LEVEL_UP_MESSAGE_TIME = 3.0
+
+def start_recording(path):
+    # Record everything shown on the terminal to a cast file (replay with: python recording.py play <path>)
+    # The recorder sits behind the render thread, so recording adds no work to the game loop
+    set_renderer(ThreadedRenderer(CastRecorder(TerminalRenderer(), path))).close()
+
+def show(*values, sep=" "):
+    # Message text under the current frame (replaces print so headless/capture backends see it too)
+    RENDERER.text(sep.join(str(value) for value in values))
 
 # --- Inventory helpers (stacked items) ---
 # Handle stacking multiple items of same type to keep inventory compact
+# The inventory is an Inventory (inventory.py): stacks indexed by name, so these are O(1) lookups, not list scans
 def add_item(inventory, name, qty=1):
-    # Search for existing item; if found, add to its count; otherwise create new stack
-    for item in inventory:
-        if item['name'] == name:
-            item['count'] += qty
-            return
-    inventory.append({'name': name, 'count': qty})
+    # Add to the item's stack, or create a new stack in the next slot
+    inventory.add(name, qty)
 
 def remove_item(inventory, name, qty=1):
-    # Find item by name and reduce count by qty; if count drops to 0, remove entry from inventory
-    for i, item in enumerate(inventory):
-        if item['name'] == name:
-            if item['count'] > qty:
-                item['count'] -= qty
-            else:
-                inventory.pop(i)
-            return True
-    return False
+    # Reduce the item's count by qty; if count drops to 0, remove its stack (later slots move up)
+    return inventory.remove(name, qty)
 
 def inventory_slot_name(inventory, slot):
-    # Return the item name at given slot index; bounds check to prevent index errors
-    if 0 <= slot < len(inventory):
-        return inventory[slot]['name']
-    return None
+    # Return the item name at given slot index, or None for an empty slot
+    return inventory.slot_name(slot)
 
 
 def normalize_inventory(inventory_data):
@@ -116,6 +168,11 @@ def _call(controller, *names, default=None):
             return getattr(controller, method_name)
     return default
 
+def music_log(*values):
+    # MusicController status output ("Playing track: ...", "PowerShell not found.") goes to the message log,
+    # so it is drawn inside the next frame instead of being printed over the diffed screen from the game thread
+    MESSAGES.add(" ".join(str(value) for value in values))
+
 def music_play(controller, name):
     fn = _call(controller, "play", "play_track")
     if fn:
@@ -155,30 +212,54 @@ def music_list(controller):
     if fn:
         fn()
 
-# --- Input (msvcrt) ---
-def read_action():
-    # Poll keyboard input; map key presses (WASD, arrows, space, etc.) to game action strings
-    if not msvcrt.kbhit():
+# --- Input (keyboard.py backends: msvcrt on Windows, termios + select elsewhere) ---
+# Keys are read on a background thread into a queue of timestamped events (see keyboard.InputQueue)
+KEYBOARD = get_keyboard()
+INPUT = InputQueue(KEYBOARD)
+
+KEY_TO_ACTION = {
+    ' ': 'attack', 'j': 'dodge_left', 'l': 'dodge_right', 'k': 'dodge_down', 'u': 'dodge_up',
+    '1': 'use_item_1', '2': 'use_item_2', '3': 'use_item_3', 'm': 'open_menu',
+    'w': 'up', 'W': 'up', 'up': 'up',
+    's': 'down', 'S': 'down', 'down': 'down',
+    'a': 'left', 'A': 'left', 'left': 'left',
+    'd': 'right', 'D': 'right', 'right': 'right',
+    'i': 'interact', 'I': 'interact',
+    'p': 'pause', 'P': 'pause',
+    '=': 'next_track', '+': 'next_track',
+    '-': 'prev_track', '_': 'prev_track'
+}
+
+def read_key(timeout=None):
+    # Next raw key name from the input queue (menus use this); None if `timeout` passes first
+    event = INPUT.poll(timeout)
+    return event.key if event else None
+
+def read_action(timeout=0):
+    # Wait up to `timeout` seconds for a key (None = until one arrives, 0 = just check) and map it
+    # (WASD, arrows, space, etc.) to a game action string; returns None on timeout or unmapped keys
+    event = INPUT.poll(timeout)
+    if event is None:
         return None
-    key = msvcrt.getch()
-    # Define mapping before checks
-    key_to_action_mapping = {
-        b' ': 'attack', b'j': 'dodge_left', b'l': 'dodge_right', b'k': 'dodge_down', b'u': 'dodge_up',
-        b'1': 'use_item_1', b'2': 'use_item_2', b'3': 'use_item_3', b'm': 'open_menu',
-        b'w': 'up', b'W': 'up',
-        b's': 'down', b'S': 'down',
-        b'a': 'left', b'A': 'left',
-        b'd': 'right', b'D': 'right',
-        b'i': 'interact', b'I': 'interact',
-        b'p': 'pause', b'P': 'pause',
-        b'=': 'next_track', b'+': 'next_track',
-        b'-': 'prev_track', b'_': 'prev_track'
-    }
-    # Handle arrow keys: Windows special keys start with \xe0
-    if key == b'\xe0':
-        arrow_key = msvcrt.getch()
-        return {b'H': 'up', b'P': 'down', b'K': 'left', b'M': 'right'}.get(arrow_key)
-    return key_to_action_mapping.get(key, None)
+    return KEY_TO_ACTION.get(event.key)
+
+def read_actions(timeout=0):
+    # One frame's input batch: wait up to `timeout` for the first key, then take everything else queued.
+    # Returns [(arrival_time, action), ...] oldest first; unmapped keys are dropped.
+    first = INPUT.poll(timeout)
+    if first is None:
+        return []
+    timed_actions = []
+    for event in [first] + INPUT.drain():
+        action = KEY_TO_ACTION.get(event.key)
+        if action:
+            timed_actions.append((event.time, action))
+    return timed_actions
+
+def wait_for_pause_key():
+    # Block (no polling) until the pause key is pressed again
+    while read_action(timeout=None) != 'pause':
+        pass
 
 # --- FS helpers ---
 def locate_music_file(filename, base_directory):
@@ -198,16 +279,37 @@ def locate_music_file(filename, base_directory):
     return None
 
 # --- Map / Tiles ---
+# `tiles` is normally a TileGrid (one byte per map cell, see tile_grid.py).
+# Plain lists of {'id', 'x', 'y'} dicts (e.g. read back from a save file) are still accepted.
 def setup_tile(tiles, tile_id, x, y):
-    # Create and append a tile entry to the tiles list at given coordinates
+    # Place a tile at given coordinates
     # Steps:
-    #  - Create dict with tile id and coordinates, then append
-    #  - Return the modified tiles list for convenience
-    tiles.append({'id': tile_id, 'x': x, 'y': y})
+    #  - TileGrid: store the tile code in the cell; list: append a tile dict
+    #  - Return the modified tiles for convenience
+    if isinstance(tiles, TileGrid):
+        tiles.set(x, y, tile_id)
+    else:
+        tiles.append({'id': tile_id, 'x': x, 'y': y})
     return tiles
 
+def remove_tile(tiles, tile_id, x, y):
+    # Remove the tile with this id at (x, y); return True if one was removed
+    if isinstance(tiles, TileGrid):
+        if tiles.get(x, y) != tile_id:
+            return False
+        tiles.clear(x, y)
+        return True
+    for tile in list(tiles):
+        if tile.get('id') == tile_id and tile.get('x') == x and tile.get('y') == y:
+            tiles.remove(tile)
+            return True
+    return False
+
 def get_tile_id(x_pos, y_pos, tiles):
-    # Find tile at given map coordinates; return 'id' field if found, else 'empty' for passable tiles
+    # Find tile at given map coordinates; return its id, else 'empty' for passable tiles
+    if isinstance(tiles, TileGrid):
+        return tiles.get(x_pos, y_pos)
+    # Plain lists still work with a linear scan
     for tile in tiles:
         if tile['x'] == x_pos and tile['y'] == y_pos:
             return tile['id']
@@ -217,356 +319,330 @@ def check_collision(x_pos, y_pos, tiles):
     # Return True if tile at position is passable (not wall/blocked)
     return get_tile_id(x_pos, y_pos, tiles) not in ("wall", "blocked")
 
-def render_map(map_data, player_x, player_y, player_stats=None):
-    # Clear screen, draw map grid with player marker overlaid, display UI info
-    os.system("cls")
+def _camera_axis(player, start, view, size, margin):
+    # Window start on one axis: keep `start` while the player is `margin` cells inside it, else center on the player
+    if start is None or not start + margin <= player < start + view - margin:
+        start = player - view // 2
+    return max(0, min(start, size - view))
+
+def map_viewport(map_width, map_height, player_x, player_y, view_width, view_height, previous=None, margin=0.0):
+    # Return (left, top, right, bottom) of a view window around the player
+    # Steps:
+    #  - Shrink the window to the map if the map is smaller than the screen
+    #  - Keep the previous window's (left, top) on each axis while the player is inside its dead zone
+    #    (`margin` as a fraction of the window size from each edge); otherwise center it on the player
+    #  - Clamp so it never scrolls past the map edges
+    view_width = max(1, min(view_width, map_width))
+    view_height = max(1, min(view_height, map_height))
+    last_left, last_top = previous or (None, None)
+    left = _camera_axis(player_x, last_left, view_width, map_width, int(view_width * margin))
+    top = _camera_axis(player_y, last_top, view_height, map_height, int(view_height * margin))
+    return left, top, left + view_width, top + view_height
+
+# Where the field camera was last frame (per map object), so the window only moves when the player leaves its dead zone
+_CAMERA = {'map': None, 'origin': None}
+
+# Rows of the last drawn map window, keyed by map object, glyph version and window bounds
+_MAP_VIEW_CACHE = {'map': None, 'key': None, 'rows': None}
+
+def set_map_glyph(map_data, x, y, ch):
+    # Change one character of the drawn map (e.g. clear a defeated boss marker) and keep render caches valid
+    if hasattr(map_data, 'set_glyph'):
+        map_data.set_glyph(x, y, ch)
+    elif 0 <= y < len(map_data) and 0 <= x < len(map_data[y]):
+        row = map_data[y]
+        map_data[y] = row[:x] + ch + row[x + 1:]
+        _MAP_VIEW_CACHE['map'] = None
+
+def render_map(map_data, player_x, player_y, player_stats=None, camera=None):
+    # Draw map grid with player marker overlaid and UI info as one frame (only changed cells hit the terminal)
+    # camera=True (default from CAMERA_MODE) draws only a terminal-sized window that follows the player
     if not map_data or len(map_data) == 0:
-        print("[No map data]")
+        RENDERER.present(["[No map data]"])
         return
-    
-    for row_index, map_row in enumerate(map_data):
-        line = ""
-        for column_index, tile_character in enumerate(map_row):
-            if row_index == player_y and column_index == player_x:
-                line += "⇩"  # Player marker
-            else:
-                line += tile_character
-        print(line)
-    print(f"\n[Identifiers: @ = boss | C = chest | N = NPC | D = door | # = wall]")
+    if camera is None:
+        camera = CAMERA_MODE
+    map_height = len(map_data)
+    map_width = getattr(map_data, 'width', len(map_data[0]))
+    if camera:
+        # Leave the last column free (avoids auto-wrap) and room for the UI lines under the map
+        columns, lines = shutil.get_terminal_size((80, 24))
+        previous = _CAMERA['origin'] if _CAMERA['map'] is map_data else None
+        left, top, right, bottom = map_viewport(map_width, map_height, player_x, player_y, columns - 1, lines - MAP_UI_LINES,
+                                                previous, CAMERA_MARGIN)
+        _CAMERA['map'] = map_data
+        _CAMERA['origin'] = (left, top)
+    else:
+        left, top, right, bottom = 0, 0, map_width, map_height
+
+    # Reuse the pre-rendered view rows unless the window moved or the glyph layer changed
+    view_key = (getattr(map_data, 'version', 0), left, top, right, bottom)
+    if _MAP_VIEW_CACHE['map'] is not map_data or _MAP_VIEW_CACHE['key'] != view_key:
+        _MAP_VIEW_CACHE['map'] = map_data
+        _MAP_VIEW_CACHE['key'] = view_key
+        _MAP_VIEW_CACHE['rows'] = [map_data[row_index][left:right] for row_index in range(top, bottom)]
+    frame_lines = list(_MAP_VIEW_CACHE['rows'])
+    # Splice the player marker into its row only
+    if top <= player_y < bottom:
+        row = frame_lines[player_y - top]
+        column = player_x - left
+        if 0 <= column < len(row):
+            frame_lines[player_y - top] = row[:column] + "⇩" + row[column + 1:]
+    frame_lines.append("")
+    frame_lines.append("[Identifiers: @ = boss | C = chest | N = NPC | D = door | # = wall]")
     # Display player stats and progress if provided
     if player_stats:
-        current_level = player_stats.get('Level', 1)
-        current_exp = player_stats.get('exp', 0)
-        next_level_exp_requirement = exp_needed_for_level(current_level + 1)
-        print(f"[Level {current_level} | HP {player_stats.get('HP')}/{player_stats.get('max_hp')} | EXP {current_exp}/{next_level_exp_requirement}]")
-    print(f"[Controls: WASD/arrows=move, i=interact, p=pause, m=menu, 1-3=use item]")
+        # next_level_exp is cached on the PlayerStats, so drawing every frame doesn't recompute the threshold
+        frame_lines.append(f"[Level {player_stats.Level} | HP {player_stats.HP}/{player_stats.max_hp} | EXP {player_stats.exp}/{player_stats.next_level_exp}]")
+    frame_lines.append("[Controls: WASD/arrows=move, i=interact, p=pause, m=menu, 1-3=use item]")
+    frame_lines.extend(MESSAGES.lines(pad=True))
+    RENDERER.present(frame_lines)
 
 # --- Save/Load ---
+def _json_default(obj):
+    # Let game objects (e.g. TileGrid) serialize themselves to their plain save shape
+    if hasattr(obj, 'to_json'):
+        return obj.to_json()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
 def save_game(player_stats, inventory, game_mode, tiles, controller, save_file=SAVE_FILE):
     # Save current game state to disk
     # Steps:
-    #  - Serialize player stats, inventory, game mode, tiles, and currently playing track
+    #  - Serialize player stats, inventory, game mode, tiles, currently playing track and the RNG stream seeds
     #  - Write JSON to the save file, handle exceptions
     data = {
         "player_stats": player_stats,
         "inventory": inventory,
         "game_mode": game_mode,
         "tiles": tiles,
-        "current_track": getattr(controller, "current_track", None)
+        "current_track": getattr(controller, "current_track", None),
+        "rng": RNG.checkpoint()
     }
     try:
         with open(save_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-        print("Saved.")
+            json.dump(data, f, indent=2, default=_json_default)
+        show("Saved.")
     except Exception as e:
-        print("Save error:", e)
+        show("Save error:", e)
 
 def load_game(controller, save_file=SAVE_FILE):
     # Load game state from disk
     # Steps:
     #  - Attempt to open save file and parse JSON
-    #  - Extract player stats, inventory, tiles, and last track and return them
+    #  - Extract player stats (as a PlayerStats), inventory, tiles, and last track and return them
+    #  - Continue the RNG streams from the save (older saves without them get a fresh seed)
     try:
         with open(save_file, "r", encoding="utf-8") as f:
             data = json.load(f)
-        player_stats = data.get("player_stats", {})
-        inventory = normalize_inventory(data.get("inventory", []))
+        player_stats = PlayerStats.from_json(data.get("player_stats", {}))
+        inventory = Inventory.from_json(normalize_inventory(data.get("inventory", [])))
         game_mode = data.get("game_mode", "field")
         tiles = data.get("tiles", [])
         track = data.get("current_track")
+        RNG.restore(data.get("rng"))
         if track:
             music_play(controller, track)
-        print("Loaded.")
+        show("Loaded.")
         return player_stats, inventory, game_mode, tiles
     except FileNotFoundError:
-        print("No save file.")
+        show("No save file.")
         return None, None, None, None
 
 
 # --- Leveling system ---
-def exp_needed_for_level(level):
-    # Calculate exponential experience requirement: 100 * 1.2^(level-1)
-    if level <= 1:
-        return 0
-    return int(100 * (1.2 ** (level - 1)))
-
+# exp_needed_for_level / level_stats live in player.py next to PlayerStats, with the cached EXP threshold table
 def check_level_up(player_stats):
-    # Check if current exp >= next level threshold. If so: increment level, recalculate attack/defence stats, show message
-    current_level = player_stats.get('Level', 1)
-    current_exp = player_stats.get('exp', 0)
-    next_exp_needed = exp_needed_for_level(current_level + 1)
-    # Check if player has enough exp to level
-    if current_exp >= next_exp_needed:
-        player_stats['Level'] += 1
-        # Update stats on level up
-        base_attack = 12
-        base_defence = 5
-        attack_per_level = 0.5
-        defence_per_level = 0.2
-        player_stats['attack'] = base_attack + int((player_stats['Level'] - 1) * attack_per_level)
-        player_stats['defence'] = base_defence + int((player_stats['Level'] - 1) * defence_per_level)
-        print(f"\n!!! LEVEL UP !!! You are now Level {player_stats['Level']}!")
-        print(f"Attack: {player_stats['attack']} | Defence: {player_stats['defence']}")
-        time.sleep(1)
-        return True
-    return False
-
-# --- Items / usage ---
-def use_item(player_stats, inventory, item_name, items_db=None):
-    # Find item in inventory, apply effect (heal/level), remove if consumable, return success status
-    items_db = items_db or ITEMS
-    # Inventory format: list of {'name': str, 'count': int}
-    entry = None
-    for item in inventory:
-        if item['name'] == item_name:
-            entry = item
-            break
-    if not entry:
-        print("You don't have that item.")
+    # Apply every level the player's exp has reached in one go. Returns True if the level went up.
+    # Steps:
+    #  - Cheap check against the cached next threshold first (the usual case after a fight is no level up)
+    #  - Bisect the threshold table for the final level, then recalculate attack/defence once and log one message
+    if player_stats.exp < player_stats.next_level_exp:
         return False
-    item_info = items_db.get(item_name)
-    if not item_info:
-        print(f"Unknown item: {item_name}")
+    new_level = level_for_exp(player_stats.exp)
+    if new_level <= player_stats.Level:
         return False
-
-    # Apply healing effect (capped at max HP)
-    if 'heal' in item_info:
-        heal_amount = item_info['heal']
-        previous_hp = player_stats.get('HP', 0)
-        max_hp = player_stats.get('max_hp', previous_hp)
-        new_hp = min(previous_hp + heal_amount, max_hp)
-        actual_healing_done = new_hp - previous_hp
-        player_stats['HP'] = new_hp
-        print(f"Used {item_name}. Healed {actual_healing_done} HP (HP: {previous_hp} -> {player_stats['HP']})")
-
-    # Level set / ancient power
-    # Apply level-setting effect (e.g., Ancient Cypher)
-    elif 'level' in item_info:
-        previous_level = player_stats.get('Level', 1)
-        player_stats['Level'] = item_info['level']
-        print(f"Used {item_name}. Level: {previous_level} -> {player_stats['Level']}")
-
-    else:
-        print(f"Used {item_name}.")
-
-    # Remove from inventory if consumable (non-consumable items persist)
-    is_consumable = item_info.get('consumable', True)
-    if is_consumable:
-        remove_item(inventory, item_name, qty=1)
+    gained = new_level - player_stats.Level
+    # Setting Level/attack/defence refreshes the cached threshold and effective stats
+    player_stats.Level = new_level
+    player_stats.attack, player_stats.defence = level_stats(new_level)
+    # Logged instead of printed + slept on, so the game keeps running while it's on screen
+    levels = "" if gained == 1 else f" (+{gained} levels)"
+    MESSAGES.add(f"!!! LEVEL UP !!! You are now Level {new_level}{levels}! "
+                 f"Attack: {player_stats.attack} | Defence: {player_stats.defence}", LEVEL_UP_MESSAGE_TIME)
     return True
 
+# --- Items / usage ---
+def use_item(player_stats, inventory, item_name, items_db=None, report=None):
+    # Apply an item's effect (ITEMS and the rules live in inventory.py); what happened goes to the message log
+    # unless `report` says otherwise (the Items menu show()s it above its Enter prompt)
+    return apply_item(player_stats, inventory, item_name, items_db, report=report or MESSAGES.add)
+
 # --- UI / menus ---
 def mp3_player_menu(controller):
     names = list(controller.tracks.keys())
     if not names:
-        print("No tracks.")
+        show("No tracks.")
         return
     idx = 0
     while True:
-        os.system("cls")
-        print("=== Music Player (WAV/MP3) ===")
+        frame_lines = ["=== Music Player (WAV/MP3) ==="]
         for i, n in enumerate(names):
-            print(f"{'> ' if i==idx else '  '}{n}")
-        print("Enter = play, p = pause/resume, s = stop, +/- = next/prev, Esc = exit, arrows to move")
+            frame_lines.append(f"{'> ' if i==idx else '  '}{n}")
+        frame_lines.append("Enter = play, p = pause/resume, s = stop, +/- = next/prev, Esc = exit, arrows to move")
         # show current status
         if hasattr(controller, 'current_track'):
             ct = getattr(controller, 'current_track') or 'stopped'
             paused = getattr(controller, 'is_paused', False)
-            print(f"Current: {ct}{' (paused)' if paused else ''}")
-        k = msvcrt.getch()
-        if k == b'\xe0':
-            k2 = msvcrt.getch()
-            if k2 == b'H': idx = (idx-1) % len(names)
-            elif k2 == b'P': idx = (idx+1) % len(names)
-        elif k == b'\r':
+            frame_lines.append(f"Current: {ct}{' (paused)' if paused else ''}")
+        frame_lines.extend(MESSAGES.lines(pad=True))
+        RENDERER.present(frame_lines)
+        # Wake up when a logged message expires too, so it is cleared from the menu
+        k = read_key(timeout=MESSAGES.time_to_expiry())
+        if k == 'up': idx = (idx-1) % len(names)
+        elif k == 'down': idx = (idx+1) % len(names)
+        elif k == 'enter':
             music_play(controller, names[idx])
-        elif k in (b'p', b'P'):
+        elif k in ('p', 'P'):
             # toggle pause/resume depending on paused flag
             if getattr(controller, 'is_paused', False):
                 music_resume(controller)
             else:
                 music_pause(controller)
-        elif k in (b's', b'S'):
+        elif k in ('s', 'S'):
             music_stop(controller)
-        elif k in (b'=', b'+'):
+        elif k in ('=', '+'):
             music_next(controller)
-        elif k in (b'-', b'_'):
+        elif k in ('-', '_'):
             music_prev(controller)
-        elif k == b'\x1b':
+        elif k == 'esc':
             break
 
 def tutorial_mode():
     # Interactive tutorial showing controls, map identifiers, menus, and test battle.
     # Walk player through controls, menu items, and run a minimal test battle
-    os.system("cls")
-    print("=== TUTORIAL ===")
-    print("\n1. MAP IDENTIFIERS:")
-    print("   @ = Boss (Guardian) - collect 9 ancient fragments, combine into Ancient Cypher")
-    print("   C = Chest (not implemented)")
-    print("   N = NPC (not implemented)")
-    print("   D = Door (not implemented)")
-    print("   # = Wall (cannot pass)")
-    print("   ⇩ = Your Player")
-    input("\nPress Enter to continue...")
+    RENDERER.clear()
+    show("=== TUTORIAL ===")
+    show("\n1. MAP IDENTIFIERS:")
+    show("   @ = Boss (Guardian) - collect 9 ancient fragments, combine into Ancient Cypher")
+    show("   C = Chest (not implemented)")
+    show("   N = NPC (not implemented)")
+    show("   D = Door (not implemented)")
+    show("   # = Wall (cannot pass)")
+    show("   ⇩ = Your Player")
+    wait_enter("\nPress Enter to continue...")
     
-    os.system("cls")
-    print("=== CONTROLS ===")
-    print("\nMovement:")
-    print("   W / Up Arrow    - Move up")
-    print("   S / Down Arrow  - Move down")
-    print("   A / Left Arrow  - Move left")
-    print("   D / Right Arrow - Move right")
-    print("\nIn Battle:")
-    print("   Space  - Attack (adjacent enemies only)")
-    print("   1, 2, 3 - Use item from slot 1, 2, or 3")
-    print("\nGeneral:")
-    print("   I      - Interact with tile (not implemented)")
-    print("   P      - Pause/Resume")
-    print("   M      - Open menu (Items, Save, Load, Status, Fight King)")
-    print("   = / -  - Next/Previous music track")
-    input("\nPress Enter to continue...")
+    RENDERER.clear()
+    show("=== CONTROLS ===")
+    show("\nMovement:")
+    show("   W / Up Arrow    - Move up")
+    show("   S / Down Arrow  - Move down")
+    show("   A / Left Arrow  - Move left")
+    show("   D / Right Arrow - Move right")
+    show("\nIn Battle:")
+    show("   Space  - Attack (adjacent enemies only)")
+    show("   1, 2, 3 - Use item from slot 1, 2, or 3")
+    show("\nGeneral:")
+    show("   I      - Interact with tile (not implemented)")
+    show("   P      - Pause/Resume")
+    show("   M      - Open menu (Items, Save, Load, Status, Fight King)")
+    show("   = / -  - Next/Previous music track")
+    wait_enter("\nPress Enter to continue...")
     
-    os.system("cls")
-    print("=== MENUS ===")
-    print("\nPress M to open menu anytime. Menu options:")
-    print("   Resume    - Close menu and continue")
-    print("   Items     - View and use items (arrow keys to select, Enter to use)")
-    print("   Fight King - Challenge the final boss (Level 99 recommended!)")
-    print("   Tutorial  - View this tutorial again")
-    print("   Save      - Save your game")
-    print("   Load      - Load your last save")
-    print("   Music Player - Play WAV/MP3 tracks")
-    print("   Status    - View stats (Level, HP, EXP, Attack, Defence)")
-    print("   Quit to Title - Return to main menu")
-    input("\nPress Enter to continue...")
+    RENDERER.clear()
+    show("=== MENUS ===")
+    show("\nPress M to open menu anytime. Menu options:")
+    show("   Resume    - Close menu and continue")
+    show("   Items     - View and use items (arrow keys to select, Enter to use)")
+    show("   Fight King - Challenge the final boss (Level 99 recommended!)")
+    show("   Swarm Battle - Fight a horde of hundreds of Wisps (needs NumPy)")
+    show("   Tutorial  - View this tutorial again")
+    show("   Save      - Save your game")
+    show("   Load      - Load your last save")
+    show("   Music Player - Play WAV/MP3 tracks")
+    show("   Status    - View stats (Level, HP, EXP, Attack, Defence)")
+    show("   Quit to Title - Return to main menu")
+    wait_enter("\nPress Enter to continue...")
     
-    os.system("cls")
-    print("=== LEVELING & COMBAT ===")
-    print("\nLeveling:")
-    print("   Defeat enemies to gain EXP")
-    print("   Each level needs 1.2x more EXP than the last")
-    print("   Level up to increase Attack and Defence")
-    print("\nBattle Tips:")
-    print("   You can only attack enemies that are ADJACENT (next to you)")
-    print("   Use items to heal with potions")
-    print("   Collect 9 ancient_fragment from bosses (@) to get Ancient Cypher")
-    print("   Ancient Cypher sets your level to 99 instantly (non-consumable)")
-    print("\nFighting the King:")
-    print("   King is the final boss - unlock by reaching Menu's 'Fight King' option")
-    print("   King has 2 phases:")
-    print("      Phase 1: Normal stats (HP 2000+, scales with your level)")
-    print("      Phase 2: Triggered at 25% HP - becomes MUCH stronger!")
-    print("   Recommendation: Reach Level 99 before fighting!")
-    input("\nPress Enter to start test battle...")
+    RENDERER.clear()
+    show("=== LEVELING & COMBAT ===")
+    show("\nLeveling:")
+    show("   Defeat enemies to gain EXP")
+    show("   Each level needs 1.2x more EXP than the last")
+    show("   Level up to increase Attack and Defence")
+    show("\nBattle Tips:")
+    show("   You can only attack enemies that are ADJACENT (next to you)")
+    show("   Use items to heal with potions")
+    show("   Collect 9 ancient_fragment from bosses (@) to get Ancient Cypher")
+    show("   Ancient Cypher sets your level to 99 instantly (non-consumable)")
+    show("\nFighting the King:")
+    show("   King is the final boss - unlock by reaching Menu's 'Fight King' option")
+    show("   King has 2 phases:")
+    show("      Phase 1: Normal stats (HP 2000+, scales with your level)")
+    show("      Phase 2: Triggered at 25% HP - becomes MUCH stronger!")
+    show("   Recommendation: Reach Level 99 before fighting!")
+    wait_enter("\nPress Enter to start test battle...")
     
     # Test battle with 0 damage from enemy
-    os.system("cls")
-    print("=== TEST BATTLE ===")
-    print("\nYou face a Training Dummy (0 damage to you)!")
-    print("Try attacking with Space. Enemy will not damage you.")
+    RENDERER.clear()
+    show("=== TEST BATTLE ===")
+    show("\nYou face a Training Dummy (0 damage to you)!")
+    show("Try attacking with Space. Enemy will not damage you.")
     time.sleep(1)
-    input("\nPress Enter to begin...")
+    wait_enter("\nPress Enter to begin...")
     
     # Minimal test battle
-    test_player = {'x': 50, 'y': 48, 'HP': 100, 'max_hp': 100, 'attack': 12, 'defence': 5, 'Level': 1, 'exp': 0, 'munny': 0}
-    test_inventory = []
-    test_enemies = [{
-        'name': 'Training Dummy', 'HP': 20, 'attack': 0, 'defence': 0, 'speed': 0,
-        'battle_x': 30, 'battle_y': 25, 'size_width': 1, 'size_height': 1,
-        'sprite': ['◻'], 'exp': 0, 'drop': None, 'drop_chance': 0
-    }]
+    test_player = PlayerStats(x=50, y=48, HP=100, max_hp=100)
+    test_inventory = Inventory()
     test_sprite = {'walk': ['⇩','↧'], 'frames':['⇩','↧','@']}
-    
-    frame = 0
-    last_update = time.time()
-    last_move_time = 0.0
-    last_attack_time = 0.0
-    MOVE_DELAY = 0.10
-    ATTACK_DELAY = 0.35
-    RENDER_DELAY = 0.06
-    battle_width, battle_height = BATTLE_WIDTH, BATTLE_HEIGHT
-    player_bpos = {'x': battle_width // 2, 'y': battle_height - 2}
-    
-    while True:
-        now = time.time()
-        if now - last_update > 0.3:
-            frame += 1
-            last_update = now
-        render_battle_grid(test_player, player_bpos, test_enemies, frame, test_sprite, battle_width=battle_width, battle_height=battle_height)
-        print("(Defeat the dummy, then press P to exit)")
-        action = read_action()
-        
-        if action is None:
-            time.sleep(RENDER_DELAY)
-            continue
-        if action == 'pause':
-            print("\nTutorial complete! Returning to main menu...")
-            time.sleep(1)
-            return
-        if action in ('up','down','left','right'):
-            if last_move_time == 0.0 or now - last_move_time > MOVE_DELAY:
-                dx = {'left':-1,'right':1,'up':0,'down':0}[action]
-                dy = {'up':-1,'down':1,'left':0,'right':0}[action]
-                old_px, old_py = player_bpos['x'], player_bpos['y']
-                player_bpos['x'] = max(0, min(battle_width-1, player_bpos['x'] + dx))
-                player_bpos['y'] = max(0, min(battle_height-1, player_bpos['y'] + dy))
-                collided = False
-                for e in test_enemies:
-                    if int(e.get('battle_x')) == int(player_bpos['x']) and int(e.get('battle_y')) == int(player_bpos['y']):
-                        collided = True; break
-                if collided:
-                    player_bpos['x'], player_bpos['y'] = old_px, old_py
-                last_move_time = now
-            time.sleep(RENDER_DELAY)
-        elif action == 'attack':
-            if now - last_attack_time > ATTACK_DELAY:
-                alive = [e for e in test_enemies if e['HP'] > 0]
-                if alive:
-                    target = min(alive, key=lambda e: abs(e.get('battle_x',0)-player_bpos['x']) + abs(e.get('battle_y',0)-player_bpos['y']))
-                    dist = abs(target.get('battle_x',0)-player_bpos['x']) + abs(target.get('battle_y',0)-player_bpos['y'])
-                    if dist <= 1:
-                        dmg = max(0, test_player.get('attack',10) - target.get('defence',0))
-                        target['HP'] -= dmg
-                        print(f"You hit {target['name']} for {dmg}!"); time.sleep(0.4)
-                    else:
-                        print('Too far to hit'); time.sleep(0.3)
-                last_attack_time = now
-        
-        if all(e['HP'] <= 0 for e in test_enemies):
-            print("\n\nDummy defeated! Tutorial complete. Returning to main menu...")
-            time.sleep(2)
-            return
+    engine = BattleEngine('training', test_player)
+    outcome = run_battle(engine, test_player, test_inventory, None, player_sprite=test_sprite,
+                         footer="(Defeat the dummy, then press P to exit)", pause_exits=True)
+    if outcome == 'quit':
+        show("\nTutorial complete! Returning to main menu...")
+        time.sleep(1)
+    else:
+        time.sleep(2)
 
 
 def menu_select(title, opts):
     # Generic menu renderer that returns the selected index (Enter) or None (Esc)
-    # Accepts an optional input function (defaults to `msvcrt.getch`) to aid testing.
+    # Accepts an optional key reader (defaults to blocking `read_key`) to aid testing.
     sel = 0
     def _getch():
-        return msvcrt.getch()
+        return read_key()
     while True:
-        os.system("cls")
-        print(f"=== {title} ===")
+        frame_lines = [f"=== {title} ==="]
         for i, o in enumerate(opts):
-            print(f"{'> ' if i==sel else '  '}{o}")
+            frame_lines.append(f"{'> ' if i==sel else '  '}{o}")
+        RENDERER.present(frame_lines)
         k = _getch()
-        if k == b'\xe0':
-            k2 = _getch()
-            if k2 == b'H': sel = (sel-1) % len(opts)
-            elif k2 == b'P': sel = (sel+1) % len(opts)
-        elif k == b'\r':
+        if k == 'up': sel = (sel-1) % len(opts)
+        elif k == 'down': sel = (sel+1) % len(opts)
+        elif k == 'enter':
             return sel
-        elif k == b'\x1b':
+        elif k == 'esc':
             return None
 
 
 def wait_enter(prompt="Enter to continue"):
     # Small helper to centralize pause prompts and make tests simpler to monkeypatch
+    # Queued frames/messages are drawn first so the prompt appears under them
+    RENDERER.flush()
     try:
-        input(prompt)
+        if not INPUT.suspendable:
+            # Windows: the key reader can't be paused while it waits, so take the Enter from the key queue instead
+            show(prompt)
+            while read_key() != 'enter':
+                pass
+            return
+        with INPUT.suspend():
+            input(prompt)
     except Exception:
         # In non-interactive tests input may raise; ignore to allow automation
         pass
+    finally:
+        # input() wrote the prompt and the echoed Enter behind the renderer's back: repaint the next frame fully
+        RENDERER.invalidate()
 
 def start_menu():
     # Main title menu displayed at startup. Handles navigation and selection.
@@ -587,17 +663,66 @@ def start_menu():
 # --- Battle / rendering frames ---
 def render_battle(player_stats, enemies, frame_index, player_sprite):
     # legacy: not used for 2D battle rendering
-    os.system("cls")
-    print("=== BATTLE (info) ===")
-    print(f"HP: {player_stats.get('HP')}  Exp: {player_stats.get('exp',0)}")
-    print("Enemies:")
+    RENDERER.clear()
+    show("=== BATTLE (info) ===")
+    show(f"HP: {player_stats.get('HP')}  Exp: {player_stats.get('exp',0)}")
+    show("Enemies:")
     for e in enemies:
-        print(f" - {e['name']} HP:{e.get('HP')} pos:({e.get('battle_x')},{e.get('battle_y')})")
+        show(f" - {e['name']} HP:{e.get('HP')} pos:({e.get('battle_x')},{e.get('battle_y')})")
 
-def render_battle_grid(player_stats, player_bpos, enemies, frame_index, player_sprite, battle_width=BATTLE_WIDTH, battle_height=BATTLE_HEIGHT):
-    # Clear screen, create battle grid, place enemies and player sprites, display positions
-    os.system("cls")
-    grid = [[" " for _ in range(battle_width)] for _ in range(battle_height)]
+class BattleCanvas:
+    # Persistent battle frame buffer reused across frames and battles
+    # Steps:
+    #  - Rows with no sprite share one blank string, so empty rows cost nothing to build or diff
+    #  - Each frame clears only the cells drawn last frame and re-joins only rows whose cells changed
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.blank_row = " " * width
+        self.cells = [None] * height       # per-row character lists, allocated the first time a row is drawn on
+        self.lines = [self.blank_row] * height
+        self.counts = [0] * height         # sprite cells in each row this frame
+        self.occupied = []                 # (x, y) cells drawn this frame
+        self.dirty = set()
+
+    def begin(self):
+        # Erase last frame's sprites
+        for x, y in self.occupied:
+            self.cells[y][x] = " "
+            self.counts[y] = 0
+            self.dirty.add(y)
+        self.occupied = []
+
+    def draw(self, x, y, ch):
+        if 0 <= y < self.height and 0 <= x < self.width:
+            row = self.cells[y]
+            if row is None:
+                row = self.cells[y] = [" "] * self.width
+            row[x] = ch
+            self.counts[y] += 1
+            self.occupied.append((x, y))
+            self.dirty.add(y)
+
+    def finish(self):
+        # Rebuild the changed rows and return all row strings
+        for y in self.dirty:
+            self.lines[y] = "".join(self.cells[y]) if self.counts[y] else self.blank_row
+        self.dirty.clear()
+        return self.lines
+
+# One canvas per arena size, kept between frames
+_BATTLE_CANVASES = {}
+BATTLE_OBSTACLE_GLYPH = '▓'
+
+def render_battle_grid(player_stats, player_bpos, enemies, frame_index, player_sprite, battle_width=BATTLE_WIDTH, battle_height=BATTLE_HEIGHT, obstacles=(), footer=None):
+    # Place obstacles, enemies and player sprites on the persistent battle canvas and display positions (drawn as one diffed frame)
+    # `footer` (optional) is a hint line drawn under the status line, inside the frame
+    canvas = _BATTLE_CANVASES.get((battle_width, battle_height))
+    if canvas is None:
+        canvas = _BATTLE_CANVASES[(battle_width, battle_height)] = BattleCanvas(battle_width, battle_height)
+    canvas.begin()
+    for x, y in obstacles:
+        canvas.draw(x, y, BATTLE_OBSTACLE_GLYPH)
     # place enemies first so player can potentially overwrite
     for e in enemies:
         enemy_x = int(e.get('battle_x', 0))
@@ -607,377 +732,231 @@ def render_battle_grid(player_stats, player_bpos, enemies, frame_index, player_s
         ch = e.get('sprite', e.get('walk', ['E']))
         if isinstance(ch, list):
             ch = ch[frame_index % len(ch)]
-        else:
-            ch = ch
         for offset_y in range(size_height):
             for offset_x in range(size_width):
-                target_x = enemy_x + offset_x
-                target_y = enemy_y + offset_y
-                if 0 <= target_y < battle_height and 0 <= target_x < battle_width:
-                    grid[target_y][target_x] = ch
+                canvas.draw(enemy_x + offset_x, enemy_y + offset_y, ch)
 
     # place player
     player_x = int(player_bpos['x'])
     player_y = int(player_bpos['y'])
     player_frame = player_sprite.get('frames', [player_sprite.get('walk')])[frame_index % max(1, len(player_sprite.get('frames', [player_sprite.get('walk')]))) ]
-    if 0 <= player_y < battle_height and 0 <= player_x < battle_width:
-        grid[player_y][player_x] = player_frame
-
-    # print grid
-    print("=== BATTLE ===")
-    for row in grid:
-        print("".join(row))
-    print(f"HP: {player_stats.get('HP')}  PlayerPos:({player_x},{player_y})")
+    canvas.draw(player_x, player_y, player_frame)
+
+    # draw grid
+    frame_lines = ["=== BATTLE ==="]
+    frame_lines.extend(canvas.finish())
+    frame_lines.append(f"HP: {player_stats.get('HP')}  PlayerPos:({player_x},{player_y})")
+    if footer:
+        frame_lines.append(footer)
+    frame_lines.extend(MESSAGES.lines(pad=True))
+    RENDERER.present(frame_lines)
+
+# --- Battle driver ---
+PLAYER_BATTLE_SPRITE = {'walk': ['⇩','↧'], 'frames':['⇩','↧']}
+BATTLE_FRAME_TIME = 0.06  # seconds between battle frames (input wait per loop)
+BATTLE_MESSAGE_TIMES = {'player_hit': 1.5, 'enemy_hit': 1.5, 'miss': 1.0, 'phase': 3.0}  # seconds each event stays in the log
+REWARD_MESSAGE_TIME = 3.0
+BATTLE_AI_BUDGET = 0.02  # real seconds of enemy AI per frame; enemies beyond it take their turn next frame
+
+def run_battle(engine, player_stats, inventory, controller, player_sprite=PLAYER_BATTLE_SPRITE, footer=None, pause_exits=False):
+    # Play a BattleEngine fight interactively; return its outcome ('victory', 'defeat') or 'quit' (pause_exits only)
+    # Steps:
+    #  - Draw the arena, wait up to one frame for keys and gate moves/attacks by key arrival time
+    #  - Handle pause, items, menu and music here; pass moves and attacks to engine.tick()
+    #  - Log the tick's events under the arena (nothing waits for them to be read); time spent paused or in menus is not simulated
+    #  - Victory is logged too and the arena drawn once more, so the message stays up on the next screen; defeat is printed
+    if controller is not None:
+        track = engine.encounter.get('music')
+        if track and track in controller.tracks:
+            music_play(controller, track)
+    input_gates = {}  # last accepted event time per input group (see gate_actions)
+    engine.ai_budget = BATTLE_AI_BUDGET
+    MESSAGES.clear()
+    last_tick = time.monotonic()
+    while True:
+        render_battle_grid(player_stats, engine.player_pos, engine.alive_enemies(), int(engine.time / 0.3), player_sprite,
+                           battle_width=engine.width, battle_height=engine.height, obstacles=engine.obstacles, footer=footer)
+        if engine.outcome is not None:
+            break
+        actions = gate_actions(read_actions(timeout=BATTLE_FRAME_TIME), input_gates, INPUT_DELAYS)
+        engine_actions = []
+        for action in actions:
+            if action in MOVES or action == 'attack':
+                engine_actions.append(action)
+            elif action == 'pause':
+                if pause_exits:
+                    return 'quit'
+                show("Battle paused. press p to resume.")
+                wait_for_pause_key()
+                last_tick = time.monotonic()
+            elif isinstance(action, str) and action.startswith('use_item_'):
+                # quick-use in battle
+                try:
+                    slot = int(action.rsplit('_', 1)[-1]) - 1
+                    if 0 <= slot < len(inventory):
+                        item_name = inventory_slot_name(inventory, slot)
+                        use_item(player_stats, inventory, item_name, ITEMS)
+                    else:
+                        MESSAGES.add("No item in that slot.")
+                except Exception:
+                    pass
+            elif action == 'open_menu' and controller is not None:
+                in_game_menu(player_stats, inventory, controller)
+                last_tick = time.monotonic()
+            elif action == 'next_track' and controller is not None:
+                music_next(controller)
+            elif action == 'prev_track' and controller is not None:
+                music_prev(controller)
+        now = time.monotonic()
+        events = engine.tick(now - last_tick, engine_actions)
+        last_tick = now
+        for kind, text in events:
+            if kind == 'music':
+                if controller is not None and text in controller.tracks:
+                    music_play(controller, text)
+                continue
+            if kind == 'defeat':
+                show(text)
+            else:
+                MESSAGES.add(text, BATTLE_MESSAGE_TIMES.get(kind, REWARD_MESSAGE_TIME))
+    return engine.outcome
+
+def finish_battle(engine, player_stats, inventory):
+    # Hand out a won fight's exp and drops, then apply any level ups (messages go to the log shown on the map)
+    for name, exp_gain, drop, count in engine.rewards:
+        if exp_gain:
+            player_stats.exp += exp_gain
+            MESSAGES.add(f"Earned {exp_gain} exp from {name}.", REWARD_MESSAGE_TIME)
+        if drop and count:
+            add_item(inventory, drop, qty=count)
+            MESSAGES.add(f"{name} dropped {drop}!" if count == 1 else f"{name} dropped {count} {drop}!", REWARD_MESSAGE_TIME)
+    check_level_up(player_stats)
 
 # --- Modes ---
 def field_mode(player_stats, inventory, tiles, controller, map_data):
     # Field mode: explore map, encounter battles, interact with tiles.
     # Render map, handle input for movement/interact/menu, trigger battles/bosses, save steps
+    # Each step rolls the encounter table of the region underneath (classified once per map into a RegionMap)
     # auto-music
     if 'town' in controller.tracks and getattr(controller, "current_track", None) != 'town':
         music_play(controller, 'town')
     
+    regions = RegionMap.from_map(map_data)
     steps = player_stats.get('steps', 0)
     last_x, last_y = player_stats['x'], player_stats['y']
     render_map(map_data, last_x, last_y, player_stats)  # Initial render
     
-    RENDER_DELAY = 0.06  # seconds between each map render/loop
+    MOVE_DELAY = 0.06  # minimum time between field steps, measured on key arrival times
+    # Each direction has its own gate: held-key repeats are coalesced, but a quick w-then-d still turns the corner
+    field_gates = {direction: direction for direction in MOVES}
+    field_delays = {direction: MOVE_DELAY for direction in MOVES}
+    input_gates = {}
     while True:
-        action = read_action()
-        if action is None:
-            time.sleep(RENDER_DELAY)
-            continue
-        if action == 'pause':
-            print("Paused. press p to resume.")
-            while True:
-                if read_action() == 'pause':
-                    print("Resumed.")
-                    render_map(map_data, player_stats['x'], player_stats['y'], player_stats)
-                    break
-                time.sleep(0.02)
-            continue
-        if action in ('up','down','left','right'):
-            dx = {'left':-1,'right':1,'up':0,'down':0}[action]
-            dy = {'up':-1,'down':1,'left':0,'right':0}[action]
-            nx, ny = player_stats['x']+dx, player_stats['y']+dy
-            if check_collision(nx, ny, tiles):
-                player_stats['x'], player_stats['y'] = nx, ny
-                steps += 1
-                player_stats['steps'] = steps
-                # Only render if position changed
+        # Nothing moves on the field until a key arrives, so block instead of polling (but only until the next
+        # logged message expires, so it can be cleared); then handle every key queued since the last frame
+        # and draw once for the whole batch
+        actions = gate_actions(read_actions(timeout=MESSAGES.time_to_expiry()), input_gates, field_delays, field_gates)
+        moved = False
+        for action in actions:
+            if action == 'pause':
+                show("Paused. press p to resume.")
+                wait_for_pause_key()
+                show("Resumed.")
                 render_map(map_data, player_stats['x'], player_stats['y'], player_stats)
-                time.sleep(RENDER_DELAY)
-                # check for boss tile and trigger mini-boss
-                tid = get_tile_id(player_stats['x'], player_stats['y'], tiles)
-                if tid == 'boss':
-                    player_stats, inventory, game_mode = mini_boss_battle(player_stats, inventory, controller, boss_pos=(nx,ny), tiles=tiles)
-                    if game_mode == 'end game':
-                        return player_stats, inventory, tiles, game_mode
-                    # Check for level up after boss
-                    while check_level_up(player_stats):
-                        pass
-                if random.random() < 0.05:
-                    if 'battle' in controller.tracks:
-                        music_play(controller, 'battle')
-                    return player_stats, inventory, tiles, "battle"
-        elif isinstance(action, str) and action.startswith('use_item_'):
-            # quick-use slots: use item 1/2/3
-            try:
-                slot = int(action.rsplit('_', 1)[-1]) - 1
-                if 0 <= slot < len(inventory):
-                    item_name = inventory_slot_name(inventory, slot)
-                    used = use_item(player_stats, inventory, item_name, ITEMS)
-                    if used:
+                continue
+            if action in ('up','down','left','right'):
+                dx = {'left':-1,'right':1,'up':0,'down':0}[action]
+                dy = {'up':-1,'down':1,'left':0,'right':0}[action]
+                nx, ny = player_stats['x']+dx, player_stats['y']+dy
+                if check_collision(nx, ny, tiles):
+                    player_stats['x'], player_stats['y'] = nx, ny
+                    steps += 1
+                    player_stats['steps'] = steps
+                    moved = True
+                    # check for boss tile and trigger mini-boss
+                    tid = get_tile_id(player_stats['x'], player_stats['y'], tiles)
+                    if tid == 'boss':
+                        player_stats, inventory, game_mode = mini_boss_battle(player_stats, inventory, controller, boss_pos=(nx,ny), tiles=tiles)
+                        if game_mode == 'end game':
+                            return player_stats, inventory, tiles, game_mode
+                        # boss beaten: its tile is gone, so clear the '@' marker from the drawn map too
+                        if get_tile_id(nx, ny, tiles) != 'boss':
+                            set_map_glyph(map_data, nx, ny, MAP_FLOOR_GLYPH)
                         render_map(map_data, player_stats['x'], player_stats['y'], player_stats)
-                else:
-                    print("No item in that slot.")
-            except Exception:
-                pass
-        elif action == 'interact':
-            tid = get_tile_id(player_stats['x'], player_stats['y'], tiles)
-            print("Interacted with:", tid)
-            time.sleep(0.6)
-        elif action == 'open_menu':
-            in_game_menu(player_stats, inventory, controller)
-                # Close function patch (no-op)
-            # Re-render after menu closes
+                        continue
+                    # random encounter: one O(1) draw picks "no fight" or the enemy group
+                    group = ENCOUNTER_TABLES.roll(regions.region_at(nx, ny), RNG.encounter)
+                    if group:
+                        player_stats, inventory, game_mode = battle_mode(player_stats, inventory, controller, encounter=group)
+                        if game_mode == 'end game':
+                            return player_stats, inventory, tiles, game_mode
+                        render_map(map_data, player_stats['x'], player_stats['y'], player_stats)
+            elif isinstance(action, str) and action.startswith('use_item_'):
+                # quick-use slots: use item 1/2/3
+                try:
+                    slot = int(action.rsplit('_', 1)[-1]) - 1
+                    if 0 <= slot < len(inventory):
+                        item_name = inventory_slot_name(inventory, slot)
+                        use_item(player_stats, inventory, item_name, ITEMS)
+                    else:
+                        MESSAGES.add("No item in that slot.")
+                except Exception:
+                    pass
+                render_map(map_data, player_stats['x'], player_stats['y'], player_stats)
+            elif action == 'interact':
+                tid = get_tile_id(player_stats['x'], player_stats['y'], tiles)
+                MESSAGES.add(f"Interacted with: {tid}")
+                render_map(map_data, player_stats['x'], player_stats['y'], player_stats)
+            elif action == 'open_menu':
+                in_game_menu(player_stats, inventory, controller)
+                    # Close function patch (no-op)
+                # Re-render after menu closes
+                render_map(map_data, player_stats['x'], player_stats['y'], player_stats)
+            elif action == 'next_track':
+                music_next(controller)
+            elif action == 'prev_track':
+                music_prev(controller)
+        # Only render if position changed (or nothing arrived: a logged message timed out)
+        if moved or not actions:
             render_map(map_data, player_stats['x'], player_stats['y'], player_stats)
-        elif action == 'next_track':
-            music_next(controller)
-        elif action == 'prev_track':
-            music_prev(controller)
 
 # --- Boss and Fragment Functions ---
 def combine_fragments(inventory):
     # Combine 9 ancient fragments into an Ancient Cypher.
     # Count fragments in inventory; if >=9 remove 9 and add Ancient Cypher
     frag_name = 'ancient_fragment'
-    count = 0
-    for it in inventory:
-        if isinstance(it, dict) and it.get('name') == frag_name:
-            count = it.get('count', 0)
-            break
-    if count >= 9:
+    if inventory.count(frag_name) >= 9:
         remove_item(inventory, frag_name, qty=9)
         add_item(inventory, 'Ancient Cypher', qty=1)
-        print('The 9 Ancient Fragments combined into an Ancient Cypher!')
+        MESSAGES.add('The 9 Ancient Fragments combined into an Ancient Cypher!', REWARD_MESSAGE_TIME)
 
 
 def mini_boss_battle(player_stats, inventory, controller, boss_pos=None, tiles=None):
-    # Initialize mini-boss battle, manage combat loop until boss defeated or player dies
-    battle_width, battle_height = BATTLE_WIDTH, BATTLE_HEIGHT
-    player_bpos = {'x': battle_width // 2, 'y': battle_height - 2}
-    boss = {
-        'name': 'Guardian', 'HP': 60, 'attack': 10, 'defence': 3, 'speed': 1,
-        'battle_x': min(battle_width-2, player_bpos['x'] + 2), 'battle_y': player_bpos['y'], 'size_width': 1, 'size_height': 1,
-        'sprite': ['G'], 'exp': 10, 'drop': 'ancient_fragment', 'drop_chance': 100
-    }
-    enemies = [boss]
-    player_sprite = {'walk': ['⇩','↧'], 'frames':['⇩','↧']}
-    if 'battle' in controller.tracks:
-        music_play(controller, 'battle')
-
-    frame = 0
-    last_update = time.time()
-    last_move_time = 0.0
-    last_attack_time = 0.0
-    MOVE_DELAY = 0.10
-    ATTACK_DELAY = 0.35
-    RENDER_DELAY = 0.06
-
-    while True:
-        now = time.time()
-        if now - last_update > 0.3:
-            frame += 1
-            last_update = now
-        render_battle_grid(player_stats, player_bpos, enemies, frame, player_sprite, battle_width=battle_width, battle_height=battle_height)
-        action = read_action()
-        if action is None:
-            if last_move_time == 0.0 or now - last_move_time > MOVE_DELAY:
-                for e in enemies:
-                    old_x, old_y = e.get('battle_x'), e.get('battle_y')
-                    if e.get('battle_x') > player_bpos['x']: e['battle_x'] -= e['speed']
-                    elif e.get('battle_x') < player_bpos['x']: e['battle_x'] += e['speed']
-                    if e.get('battle_y') > player_bpos['y']: e['battle_y'] -= e['speed']
-                    elif e.get('battle_y') < player_bpos['y']: e['battle_y'] += e['speed']
-                    if e.get('battle_x') == player_bpos['x'] and e.get('battle_y') == player_bpos['y']:
-                        e['battle_x'], e['battle_y'] = old_x, old_y
-                last_move_time = now
-            for e in enemies:
-                dist = abs(e.get('battle_x')-player_bpos['x']) + abs(e.get('battle_y')-player_bpos['y'])
-                if dist <= 1 and random.random() < 0.15:
-                    dmg = max(0, e['attack'] - player_stats.get('defence',0))
-                    player_stats['HP'] -= dmg
-                    print(f"{e['name']} hits you for {dmg}!"); time.sleep(0.4)
-            if all(e['HP'] <= 0 for e in enemies):
-                print("You defeated the Guardian!")
-                for e in enemies:
-                    exp_gain = e.get('exp', 0)
-                    if exp_gain:
-                        player_stats['exp'] = player_stats.get('exp', 0) + exp_gain
-                        print(f"Earned {exp_gain} exp from {e['name']}.")
-                    drop = e.get('drop')
-                    if drop:
-                        add_item(inventory, drop, qty=1)
-                        print(f"{e['name']} dropped {drop}!")
-                # Check for level ups
-                while check_level_up(player_stats):
-                    pass
-                # remove boss tile so it can't be farmed
-                if boss_pos and isinstance(tiles, list):
-                    bx, by = boss_pos
-                    for t in list(tiles):
-                        if t.get('id') == 'boss' and t.get('x') == bx and t.get('y') == by:
-                            try:
-                                tiles.remove(t)
-                            except Exception:
-                                pass
-                            break
-                combine_fragments(inventory)
-                if 'town' in controller.tracks:
-                    music_play(controller, 'town')
-                time.sleep(0.5)
-                return player_stats, inventory, 'field'
-            if player_stats['HP'] <= 0:
-                print('You died...')
-                music_stop(controller)
-                return player_stats, inventory, 'end game'
-            time.sleep(RENDER_DELAY)
-            continue
-        if action == 'pause':
-            while True:
-                if read_action() == 'pause': break
-                time.sleep(0.02)
-            continue
-        if action in ('up','down','left','right'):
-            if last_move_time == 0.0 or now - last_move_time > MOVE_DELAY:
-                dx = {'left':-1,'right':1,'up':0,'down':0}[action]
-                dy = {'up':-1,'down':1,'left':0,'right':0}[action]
-                old_px, old_py = player_bpos['x'], player_bpos['y']
-                player_bpos['x'] = max(0, min(battle_width-1, player_bpos['x'] + dx))
-                player_bpos['y'] = max(0, min(battle_height-1, player_bpos['y'] + dy))
-                collided = False
-                for e in enemies:
-                    if int(e.get('battle_x')) == int(player_bpos['x']) and int(e.get('battle_y')) == int(player_bpos['y']):
-                        collided = True; break
-                if collided:
-                    player_bpos['x'], player_bpos['y'] = old_px, old_py
-                last_move_time = now
-            time.sleep(RENDER_DELAY)
-        elif action == 'attack':
-            if now - last_attack_time > ATTACK_DELAY:
-                alive = [e for e in enemies if e['HP'] > 0]
-                if alive:
-                    target = min(alive, key=lambda e: abs(e.get('battle_x',0)-player_bpos['x']) + abs(e.get('battle_y',0)-player_bpos['y']))
-                    dist = abs(target.get('battle_x',0)-player_bpos['x']) + abs(target.get('battle_y',0)-player_bpos['y'])
-                    if dist <= 1:
-                        dmg = max(0, player_stats.get('attack',10) - target.get('defence',0))
-                        target['HP'] -= dmg
-                        print(f"You hit {target['name']} for {dmg}!"); time.sleep(0.4)
-                    else:
-                        print('Too far to hit'); time.sleep(0.3)
-                last_attack_time = now
-        elif isinstance(action, str) and action.startswith('use_item_'):
-            try:
-                slot = int(action.rsplit('_', 1)[-1]) - 1
-                if 0 <= slot < len(inventory):
-                    item_name = inventory_slot_name(inventory, slot)
-                    use_item(player_stats, inventory, item_name, ITEMS)
-            except Exception:
-                pass
-        elif action == 'open_menu':
-            in_game_menu(player_stats, inventory, controller)
+    # Guardian fight on a boss tile: on victory the tile is removed so it can't be farmed
+    engine = BattleEngine('guardian', player_stats, rng=RNG.combat, loot_rng=RNG.loot)
+    if run_battle(engine, player_stats, inventory, controller) == 'defeat':
+        music_stop(controller)
+        return player_stats, inventory, 'end game'
+    finish_battle(engine, player_stats, inventory)
+    if boss_pos and tiles is not None:
+        bx, by = boss_pos
+        remove_tile(tiles, 'boss', bx, by)
+    combine_fragments(inventory)
+    if 'town' in controller.tracks:
+        music_play(controller, 'town')
+    return player_stats, inventory, 'field'
 
 
 def fight_king_battle(player_stats, inventory, controller):
-    # Initialize King boss fight with level-scaling stats, handle phase transition at 25% HP, manage music switching
-    battle_width, battle_height = BATTLE_WIDTH, BATTLE_HEIGHT
-    player_bpos = {'x': battle_width // 2, 'y': battle_height - 2}
-    
-    # Scale King stats based on player level
-    player_level = player_stats.get('Level', 1)
-    boss_max = 2000 + (player_level * 50)  # Scales: level 1 = 2050, level 99 = 7050
-    king_attack = 40 + (player_level * 0.4)  # Scales: level 1 = 40.4, level 99 = 79.6
-    king_defence = (0)  # Scales: level 1 = 20.2, level 99 = 39.8
-    
-    boss = {
-        'name': 'King', 'HP': boss_max, 'max_HP': boss_max, 'attack': king_attack, 'defence': king_defence, 'speed': 1,
-        'battle_x': min(battle_width-3, player_bpos['x'] + 4), 'battle_y': player_bpos['y'], 'size_width': 2, 'size_height': 2,
-        'sprite': ['K','k'], 'exp': 500, 'drop': None, 'phase': 1
-    }
-    enemies = [boss]
-    player_sprite = {'walk': ['⇩','↧'], 'frames':['⇩','↧']}
-    # play phase1 music
-    if 'final1' in controller.tracks:
-        music_play(controller, 'final1')
-
-    frame = 0
-    last_update = time.time()
-    last_move_time = 0.0
-    last_attack_time = 0.0
-    MOVE_DELAY = 0.10
-    ATTACK_DELAY = 0.35
-    RENDER_DELAY = 0.06
-
-    while True:
-        now = time.time()
-        if now - last_update > 0.3:
-            frame += 1
-            last_update = now
-        render_battle_grid(player_stats, player_bpos, enemies, frame, player_sprite, battle_width=battle_width, battle_height=battle_height)
-
-        # phase transition when boss at 25% HP or below
-        for e in enemies:
-            if e.get('phase',1) == 1 and e.get('HP',0) <= (e.get('max_HP',1) * 0.25):
-                e['phase'] = 2
-                e['attack'] += 20
-                e['defence'] += 10
-                print('The King grows furious and enters Phase 2!')
-                if 'final2' in controller.tracks:
-                    music_play(controller, 'final2')
-
-        action = read_action()
-        if action is None:
-            if last_move_time == 0.0 or now - last_move_time > MOVE_DELAY:
-                for e in enemies:
-                    old_x, old_y = e.get('battle_x'), e.get('battle_y')
-                    if e.get('battle_x') > player_bpos['x']: e['battle_x'] -= e['speed']
-                    elif e.get('battle_x') < player_bpos['x']: e['battle_x'] += e['speed']
-                    if e.get('battle_y') > player_bpos['y']: e['battle_y'] -= e['speed']
-                    elif e.get('battle_y') < player_bpos['y']: e['battle_y'] += e['speed']
-                    if e.get('battle_x') == player_bpos['x'] and e.get('battle_y') == player_bpos['y']:
-                        e['battle_x'], e['battle_y'] = old_x, old_y
-                last_move_time = now
-            for e in enemies:
-                dist = abs(e.get('battle_x')-player_bpos['x']) + abs(e.get('battle_y')-player_bpos['y'])
-                if dist <= 1 and random.random() < 0.22:
-                    dmg = max(0, e['attack'] - player_stats.get('defence',0))
-                    player_stats['HP'] -= dmg
-                    print(f"{e['name']} hits you for {dmg}!"); time.sleep(0.5)
-            if all(e['HP'] <= 0 for e in enemies):
-                print('You defeated the King! YOU WIN THE GAME!')
-                for e in enemies:
-                    exp_gain = e.get('exp',0)
-                    if exp_gain:
-                        player_stats['exp'] = player_stats.get('exp',0) + exp_gain
-                        print(f"Earned {exp_gain} exp!")
-                # Check for level ups
-                while check_level_up(player_stats):
-                    pass
-                time.sleep(1)
-                if 'town' in controller.tracks:
-                    music_play(controller, 'town')
-                return player_stats, inventory, 'field'
-            if player_stats['HP'] <= 0:
-                print('You died...')
-                music_stop(controller)
-                return player_stats, inventory, 'end game'
-            time.sleep(RENDER_DELAY)
-            continue
-
-        if action == 'pause':
-            while True:
-                if read_action() == 'pause': break
-                time.sleep(0.02)
-            continue
-        if action in ('up','down','left','right'):
-            if last_move_time == 0.0 or now - last_move_time > MOVE_DELAY:
-                dx = {'left':-1,'right':1,'up':0,'down':0}[action]
-                dy = {'up':-1,'down':1,'left':0,'right':0}[action]
-                old_px, old_py = player_bpos['x'], player_bpos['y']
-                player_bpos['x'] = max(0, min(battle_width-1, player_bpos['x'] + dx))
-                player_bpos['y'] = max(0, min(battle_height-1, player_bpos['y'] + dy))
-                collided = False
-                for e in enemies:
-                    if int(e.get('battle_x')) == int(player_bpos['x']) and int(e.get('battle_y')) == int(player_bpos['y']):
-                        collided = True; break
-                if collided:
-                    player_bpos['x'], player_bpos['y'] = old_px, old_py
-                last_move_time = now
-            time.sleep(RENDER_DELAY)
-        elif action == 'attack':
-            if now - last_attack_time > ATTACK_DELAY:
-                alive = [e for e in enemies if e['HP'] > 0]
-                if alive:
-                    target = min(alive, key=lambda e: abs(e.get('battle_x',0)-player_bpos['x']) + abs(e.get('battle_y',0)-player_bpos['y']))
-                    dist = abs(target.get('battle_x',0)-player_bpos['x']) + abs(target.get('battle_y',0)-player_bpos['y'])
-                    if dist <= 1:
-                        dmg = max(0, player_stats.get('attack',10) - target.get('defence',0))
-                        target['HP'] -= dmg
-                        print(f"You hit {target['name']} for {dmg}!"); time.sleep(0.5)
-                    else:
-                        print('Too far'); time.sleep(0.3)
-                last_attack_time = now
-        elif isinstance(action, str) and action.startswith('use_item_'):
-            try:
-                slot = int(action.rsplit('_', 1)[-1]) - 1
-                if 0 <= slot < len(inventory):
-                    item_name = inventory_slot_name(inventory, slot)
-                    use_item(player_stats, inventory, item_name, ITEMS)
-            except Exception:
-                pass
-        elif action == 'open_menu':
-            in_game_menu(player_stats, inventory, controller)
+    # Final boss: the King scales with the player's level and enters Phase 2 at 25% HP (see battle.ENEMY_TYPES)
+    engine = BattleEngine('king', player_stats, rng=RNG.combat, loot_rng=RNG.loot)
+    if run_battle(engine, player_stats, inventory, controller) == 'defeat':
+        music_stop(controller)
+        return player_stats, inventory, 'end game'
+    finish_battle(engine, player_stats, inventory)
+    if 'town' in controller.tracks:
+        music_play(controller, 'town')
+    return player_stats, inventory, 'field'
 
 
 def in_game_menu(player_stats, inventory, controller):
@@ -985,7 +964,7 @@ def in_game_menu(player_stats, inventory, controller):
     # Steps:
     #  - Display menu options and allow navigation via arrows
     #  - Enter opens the chosen submenu or executes the selected command
-    opts = ["Resume", "Items", "Fight King", "Tutorial", "Save", "Load", "Music Player (WAV/MP3)", "Status", "Quit to Title"]
+    opts = ["Resume", "Items", "Fight King", "Swarm Battle", "Tutorial", "Save", "Load", "Music Player (WAV/MP3)", "Status", "Quit to Title"]
     while True:
         sel = menu_select("Menu", opts)
         if sel is None:
@@ -996,16 +975,15 @@ def in_game_menu(player_stats, inventory, controller):
         if ch == "Items":
             # Interactive inventory: use the generic `menu_select` for navigation
             if not inventory:
-                print("Inventory: empty"); input("Enter to continue")
+                show("Inventory: empty"); wait_enter("Enter to continue")
             else:
-                names = [it.get('name') if isinstance(it, dict) else str(it) for it in inventory]
+                names = [it['name'] for it in inventory]
                 sel = menu_select("Items", names)
                 if sel is None:
                     pass
                 else:
-                    entry = inventory[sel]
-                    item_name = entry.get('name') if isinstance(entry, dict) else str(entry)
-                    used = use_item(player_stats, inventory, item_name, ITEMS)
+                    item_name = names[sel]
+                    used = use_item(player_stats, inventory, item_name, ITEMS, report=show)
                     wait_enter("Enter to continue")
         if ch == "Fight King":
             try:
@@ -1014,7 +992,14 @@ def in_game_menu(player_stats, inventory, controller):
                 if game_mode:
                     return
             except Exception as e:
-                print("Fight King failed:", e); wait_enter("Enter to continue")
+                show("Fight King failed:", e); wait_enter("Enter to continue")
+        if ch == "Swarm Battle":
+            try:
+                player_stats, inventory, game_mode = battle_mode(player_stats, inventory, controller, encounter='swarm')
+                if game_mode:
+                    return
+            except Exception as e:
+                show("Swarm Battle failed:", e); wait_enter("Enter to continue")
         if ch == "Tutorial":
             tutorial_mode()
         if ch == "Save":
@@ -1022,219 +1007,48 @@ def in_game_menu(player_stats, inventory, controller):
         if ch == "Load":
             p, inventory_data, game_mode, tl = load_game(controller)
             if p:
-                # Normalize loaded values and cap HP to max_hp
-                p.setdefault('max_hp', p.get('HP', 120))
-                if p.get('HP', 0) > p['max_hp']:
-                    p['HP'] = p['max_hp']
-                # Update the provided dict in-place so callers see the changes
+                # Cap HP to max_hp (PlayerStats.from_json already filled in a missing max_hp)
+                if p.HP > p.max_hp:
+                    p.HP = p.max_hp
+                # Update the provided PlayerStats in-place so callers see the changes
                 player_stats.clear()
                 player_stats.update(p)
             if inventory_data is not None:
-                inventory[:] = inventory_data
+                inventory.replace(inventory_data)
             wait_enter("Enter to continue")
         if ch == "Music Player (WAV/MP3)":
             mp3_player_menu(controller)
         if ch == "Status":
-            print(player_stats); wait_enter("Enter to continue")
+            show(player_stats); wait_enter("Enter to continue")
         if ch == "Quit to Title":
             music_stop(controller)
             raise SystemExit("ReturnToTitle")
 
-def battle_mode(player_stats, inventory, controller):
-    # spawn a simple enemy; add walk sprite placeholder
-    # Initialize battle positions separate from field coords
-    # player battle position starts near bottom-center
-    battle_width, battle_height = BATTLE_WIDTH, BATTLE_HEIGHT
-    player_bpos = {'x': battle_width // 2, 'y': battle_height - 2}
-    enemies = [{
-        'name': 'Shadow',
-        'HP': 30,
-        'attack': 8,
-        'defence': 3,
-        'speed': 1,
-        'battle_x': min(battle_width-2, player_bpos['x'] + 2),
-        'battle_y': player_bpos['y'],
-        'size_width': 1,
-        'size_height': 1,
-        'walk': ['◈','◇'],   # placeholder frames
-        'sprite': ['◈','◇'],
-        'state': 'idle', 
-        'exp': 20,
-        'drop': 'potion',
-        'drop_chance': 50
-    }]
-    # player sprites - simple frames for walk
-    player_sprite = {'walk': ['⇩','↧'], 'frames':['⇩','↧']}
-
-    if 'battle' in controller.tracks:
-        music_play(controller, 'battle')
-
-
-    frame = 0
-    last_update = time.time()
-    last_move_time = 0.0
-    last_attack_time = 0.0
-    MOVE_DELAY = 0.10  # seconds between moves
-    ATTACK_DELAY = 0.35  # seconds between attacks
-    RENDER_DELAY = 0.06  # seconds between each battle render/loop
-
-    while True:
-        now = time.time()
-        # update animation frame every 0.3s
-        if now - last_update > 0.3:
-            frame += 1
-            last_update = now
-
-        # render 2D battle grid
-        render_battle_grid(player_stats, player_bpos, enemies, frame, player_sprite, battle_width=battle_width, battle_height=battle_height)
-
-        action = read_action()
-        if action is None:
-            # simulate enemies moving toward player slowly
-            if last_move_time == 0.0 or now - last_move_time > MOVE_DELAY:
-                for e in enemies:
-                    old_x, old_y = e.get('battle_x'), e.get('battle_y')
-                    if e.get('battle_x') > player_bpos['x']: e['battle_x'] -= e['speed']
-                    elif e.get('battle_x') < player_bpos['x']: e['battle_x'] += e['speed']
-                    if e.get('battle_y') > player_bpos['y']: e['battle_y'] -= e['speed']
-                    elif e.get('battle_y') < player_bpos['y']: e['battle_y'] += e['speed']
-                    if e.get('battle_x') == player_bpos['x'] and e.get('battle_y') == player_bpos['y']:
-                        e['battle_x'], e['battle_y'] = old_x, old_y
-                last_move_time = now
-            # check enemy attacks
-            for e in enemies:
-                dist = abs(e.get('battle_x')-player_bpos['x']) + abs(e.get('battle_y')-player_bpos['y'])
-                if dist <= 1 and random.random() < 0.15:
-                    dmg = max(0, e['attack'] - player_stats.get('defence',0))
-                    player_stats['HP'] -= dmg
-                    print(f"{e['name']} hits you for {dmg}!"); time.sleep(0.6)
-            # check end conditions
-            if all(e['HP'] <= 0 for e in enemies):
-                print("You won the battle!")
-                for e in enemies:
-                    exp_gain = e.get('exp', 0)
-                    if exp_gain:
-                        player_stats['exp'] = player_stats.get('exp', 0) + exp_gain
-                        print(f"Earned {exp_gain} exp from {e['name']}.")
-                    drop = e.get('drop')
-                    if drop:
-                        drop_chance = e.get('drop_chance', 50)
-                        prob = (drop_chance / 100.0) if drop_chance > 1 else float(drop_chance)
-                        if random.random() < prob:
-                            add_item(inventory, drop, qty=1)
-                            print(f"{e['name']} dropped {drop}!")
-                # Check for level ups
-                while check_level_up(player_stats):
-                    pass
-                time.sleep(0.5)
-                if 'town' in controller.tracks:
-                    music_play(controller, 'town')
-                return player_stats, inventory, "field"
-            if player_stats['HP'] <= 0:
-                print("You died...")
-                music_stop(controller)
-                return player_stats, inventory, "end game"
-            time.sleep(RENDER_DELAY)
-            continue
-
-        if action == 'pause':
-            print("Battle paused. press p to resume.")
-            while True:
-                if read_action() == 'pause':
-                    break
-                time.sleep(0.02)
-            continue
-        if action in ('up','down','left','right'):
-            # movement delay: only allow move if enough time has passed since last move
-            if last_move_time == 0.0 or now - last_move_time > MOVE_DELAY:
-                dx = {'left':-1,'right':1,'up':0,'down':0}[action]
-                dy = {'up':-1,'down':1,'left':0,'right':0}[action]
-                old_px, old_py = player_bpos['x'], player_bpos['y']
-                player_bpos['x'] = max(0, min(battle_width-1, player_bpos['x'] + dx))
-                player_bpos['y'] = max(0, min(battle_height-1, player_bpos['y'] + dy))
-                # collision: if moved into enemy, revert
-                collided = False
-                for e in enemies:
-                    if int(e.get('battle_x')) == int(player_bpos['x']) and int(e.get('battle_y')) == int(player_bpos['y']):
-                        collided = True
-                        break
-                if collided:
-                    player_bpos['x'], player_bpos['y'] = old_px, old_py
-                last_move_time = now
-            time.sleep(RENDER_DELAY)
-        elif action == 'attack':
-            # attack delay
-            if now - last_attack_time > ATTACK_DELAY:
-                # attack nearest alive enemy within range
-                alive = [e for e in enemies if e['HP'] > 0]
-                if alive:
-                    # choose nearest by battle coordinates
-                    target = min(alive, key=lambda e: abs(e.get('battle_x',0)-player_bpos['x']) + abs(e.get('battle_y',0)-player_bpos['y']))
-                    dist = abs(target.get('battle_x',0)-player_bpos['x']) + abs(target.get('battle_y',0)-player_bpos['y'])
-                    if dist <= 1:
-                        dmg = max(0, player_stats.get('attack',10) - target.get('defence',0))
-                        target['HP'] -= dmg
-                        print(f"You hit {target['name']} for {dmg}!"); time.sleep(0.5)
-                    else:
-                        print("Enemy is too far to attack!"); time.sleep(0.4)
-                last_attack_time = now
-        elif isinstance(action, str) and action.startswith('use_item_'):
-            # quick-use in battle
-            try:
-                slot = int(action.rsplit('_', 1)[-1]) - 1
-                if 0 <= slot < len(inventory):
-                    item_name = inventory_slot_name(inventory, slot)
-                    use_item(player_stats, inventory, item_name, ITEMS)
-                else:
-                    print("No item in that slot.")
-            except Exception:
-                pass
-        elif action == 'open_menu':
-            in_game_menu(player_stats, inventory, controller)
-        elif action == 'next_track':
-            music_next(controller)
-        elif action == 'prev_track':
-            music_prev(controller)
+def battle_mode(player_stats, inventory, controller, encounter='shadow'):
+    # Regular fight against any ENCOUNTERS entry: field_mode passes the group its encounter table rolled
+    # (a Shadow by default, e.g. when a save made mid-battle is loaded; 'swarm' from the menu)
+    engine = create_engine(encounter, player_stats, rng=RNG.combat, loot_rng=RNG.loot)
+    if run_battle(engine, player_stats, inventory, controller) == 'defeat':
+        music_stop(controller)
+        return player_stats, inventory, "end game"
+    finish_battle(engine, player_stats, inventory)
+    if 'town' in controller.tracks:
+        music_play(controller, 'town')
+    return player_stats, inventory, "field"
 
 # --- Main ---
 def main():
     # Main entry point: initialize game map and state, music, and run main game loop
     # Steps:
-    #  - Build a mutable map from the map definitions in maps.py and insert boss markers
-    #  - Initialize player stats, inventory, tiles and preload music via the MusicController
+    #  - Load the compiled world (map glyphs + tile layer, boss markers included) built from maps.py
+    #  - Initialize player stats, inventory and preload music via the MusicController
     #  - Open the start menu and then dispatch to field/battle/end game modes in a loop
-    # create a mutable copy of the map and insert 9 boss markers '@'
-    raw_map = list(map1)
-    map_h = len(raw_map)
-    map_w = len(raw_map[0]) if map_h > 0 else 0
-    # positions chosen as proportional offsets to fit arbitrary map sizes
-    fractions = [(0.08,0.08),(0.30,0.12),(0.55,0.18),(0.78,0.22),(0.12,0.45),(0.35,0.58),(0.58,0.66),(0.78,0.78),(0.88,0.9),(0.14,0.85)]
-    for fx, fy in fractions:
-        if map_w == 0 or map_h == 0:
-            break
-        x = min(map_w-1, max(0, int(fx * (map_w-1))))
-        y = min(map_h-1, max(0, int(fy * (map_h-1))))
-        row = list(raw_map[y])
-        row[x] = '@'
-        raw_map[y] = ''.join(row)
-    map_data = raw_map
+    # map_compiler memory-maps the cached world file and only recompiles it when maps.py changes
+    map_data, tiles, world_note = load_world("map1")
+    if world_note:
+        show(world_note)
     # initial player (started in middle-ish area)
-    player_stats = {'x': 40, 'y': 30, 'HP': 120, 'max_hp': 120, 'attack': 12, 'defence': 5, 'Level':1, 'steps':0, 'exp':0, 'munny':0, 'items':[]}
-    tiles = []
-    # place tiles from map chars (now includes '@' boss markers)
-    for y, row in enumerate(map_data):
-        for x, ch in enumerate(row):
-            if ch == '#':
-                setup_tile(tiles, "wall", x, y)
-            elif ch == 'C':
-                setup_tile(tiles, "chest", x, y)
-            elif ch == 'N':
-                setup_tile(tiles, "NPC", x, y)
-            elif ch == 'D':
-                setup_tile(tiles, "door", x, y)
-            elif ch == '@':
-                setup_tile(tiles, "boss", x, y)
-
+    player_stats = PlayerStats()
     # discover music files in same folder as script
     this_dir = os.path.dirname(os.path.abspath(__file__))
     requested = {
@@ -1251,11 +1065,11 @@ def main():
         f = locate_music_file(fname, this_dir)
         if f:
             tracks[k] = f
-            print(f"Found {k}: {f}")
+            show(f"Found {k}: {f}")
         else:
-            print(f"Missing {k}: tried {fname}")
+            show(f"Missing {k}: tried {fname}")
 
-    controller = MusicController(tracks)
+    controller = MusicController(tracks, log=music_log)
     music_list(controller)
 
     # start menu
@@ -1268,21 +1082,20 @@ def main():
     if choice == 1:
         p, inventory_data, game_mode, tl = load_game(controller)
         if p:
-            # Ensure loaded player has max_hp and cap HP to max
-            p.setdefault('max_hp', p.get('HP', 120))
-            if p.get('HP', 0) > p['max_hp']:
-                p['HP'] = p['max_hp']
+            # Cap HP to max (PlayerStats.from_json already filled in a missing max_hp)
+            if p.HP > p.max_hp:
+                p.HP = p.max_hp
             player_stats.update(p)
         loaded_inv = inventory_data
         loaded_gm = game_mode
     elif choice == 3:
         mp3_player_menu(controller)
     elif choice == 4:
-        print("Goodbye."); return
+        show("Goodbye."); return
 
     # main loop simple dispatcher
     game_mode = loaded_gm or "field"
-    inventory = loaded_inv if loaded_inv is not None else []
+    inventory = loaded_inv if loaded_inv is not None else Inventory()
     while True:
         if game_mode == "field":
             res = field_mode(player_stats, inventory, tiles, controller, map_data)
@@ -1291,8 +1104,21 @@ def main():
         elif game_mode == "battle":
             player_stats, inventory, game_mode = battle_mode(player_stats, inventory, controller)
         elif game_mode == "end game":
-            print("Game over. Exiting.")
+            show("Game over. Exiting.")
             break
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="The Fight Beyond Death: Text Adventure")
+    parser.add_argument("--record", metavar="CAST_FILE", help="record the session to a cast file for replay")
+    parser.add_argument("--seed", type=int, help="seed the game's random streams (same seed + same inputs = same run)")
+    args = parser.parse_args()
+    if args.seed is not None:
+        RNG.reseed(args.seed)
+    if args.record:
+        start_recording(args.record)
+    try:
+        main()
+    finally:
+        # Let the render thread draw any queued output before the process exits
+        RENDERER.close()
@@ -0,0 +1,196 @@
+# map_compiler.py
+# Compile the braille maps in maps.py (plus the boss marker placement) into a versioned binary
+# world file that the game memory-maps at startup instead of re-parsing and re-scanning the map.
+#
+# World file layout (little endian):
+#   header      magic 'TFBW', format version, width, height, maps.py mtime/size, marker checksum
+#   row lengths height x uint32 (map rows can be ragged)
+#   glyph layer width*height x UTF-32 code units, row by row
+#   tile layer  width*height x uint8 tile codes (see tile_grid.py)
+import os
+import sys
+import mmap
+import struct
+import zlib
+try:
+    from .tile_grid import TileGrid
+except Exception:
+    from tile_grid import TileGrid
+
+WORLD_MAGIC = b'TFBW'
+WORLD_VERSION = 1
+_HEADER = struct.Struct('<4sHHIIqqI')
+
+MAPS_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "maps.py")
+
+# Boss '@' markers, as proportional (x, y) offsets so they fit arbitrary map sizes
+BOSS_MARKER_FRACTIONS = [(0.08,0.08),(0.30,0.12),(0.55,0.18),(0.78,0.22),(0.12,0.45),(0.35,0.58),(0.58,0.66),(0.78,0.78),(0.88,0.9),(0.14,0.85)]
+
+
+def world_path(name, directory=None):
+    # Compiled worlds live next to maps.py by default: map1 -> map1.world
+    return os.path.join(directory or os.path.dirname(MAPS_SOURCE), f"{name}.world")
+
+def _markers_checksum(fractions):
+    return zlib.crc32(repr(list(fractions)).encode("ascii"))
+
+def place_markers(rows, fractions=BOSS_MARKER_FRACTIONS, marker='@'):
+    # Return a copy of the map rows with a marker written at each fractional position
+    raw_map = list(rows)
+    map_h = len(raw_map)
+    map_w = len(raw_map[0]) if map_h > 0 else 0
+    for fx, fy in fractions:
+        if map_w == 0 or map_h == 0:
+            break
+        x = min(map_w-1, max(0, int(fx * (map_w-1))))
+        y = min(map_h-1, max(0, int(fy * (map_h-1))))
+        row = list(raw_map[y])
+        row[x] = marker
+        raw_map[y] = ''.join(row)
+    return raw_map
+
+
+# --- Glyph layer ---
+class GlyphLayer:
+    # Sequence of map rows backed by the UTF-32 glyph layer of a world file.
+    # Rows are decoded the first time they are asked for and then kept, so drawing only pays for visible rows once.
+    # `version` goes up on every set_glyph() so renderers can tell when their cached rows are stale.
+    def __init__(self, buffer, offset, width, row_lengths):
+        self.buffer = buffer
+        self.offset = offset
+        self.width = width
+        self.row_lengths = row_lengths
+        self.version = 0
+        self._rows = [None] * len(row_lengths)
+
+    def __len__(self):
+        return len(self.row_lengths)
+
+    def __getitem__(self, y):
+        if isinstance(y, slice):
+            return [self[i] for i in range(*y.indices(len(self)))]
+        if y < 0:
+            y += len(self.row_lengths)
+        if not 0 <= y < len(self.row_lengths):
+            raise IndexError("map row out of range")
+        row = self._rows[y]
+        if row is None:
+            start = self.offset + y * self.width * 4
+            row = self._rows[y] = self.buffer[start:start + self.row_lengths[y] * 4].decode("utf-32-le")
+        return row
+
+    def __iter__(self):
+        for y in range(len(self.row_lengths)):
+            yield self[y]
+
+    def set_glyph(self, x, y, ch):
+        # Replace one map character (needs a writable buffer, e.g. the copy-on-write mmap) and refresh its row
+        if not (0 <= y < len(self.row_lengths) and 0 <= x < self.row_lengths[y]):
+            raise IndexError(f"glyph ({x}, {y}) outside the map")
+        start = self.offset + (y * self.width + x) * 4
+        self.buffer[start:start + 4] = ch.encode("utf-32-le")
+        row = self._rows[y]
+        if row is not None:
+            self._rows[y] = row[:x] + ch + row[x + 1:]
+        self.version += 1
+
+
+# --- Compile ---
+def compile_world(rows, fractions=BOSS_MARKER_FRACTIONS, source_stat=(0, 0)):
+    # Build the world file bytes from map rows
+    # Steps:
+    #  - Insert the boss markers, then size the layers from the longest row
+    #  - Pack header, row lengths, glyph layer (padded rows) and tile layer
+    rows = place_markers(rows, fractions)
+    height = len(rows)
+    width = max((len(row) for row in rows), default=0)
+    tiles = TileGrid.from_map(rows)
+    glyphs = "".join(row.ljust(width, '\0') for row in rows).encode("utf-32-le")
+    mtime_ns, size = source_stat
+    header = _HEADER.pack(WORLD_MAGIC, WORLD_VERSION, 0, width, height, mtime_ns, size, _markers_checksum(fractions))
+    lengths = struct.pack(f'<{height}I', *(len(row) for row in rows))
+    return header + lengths + glyphs + bytes(tiles.cells)
+
+def _source_stat(source=MAPS_SOURCE):
+    try:
+        st = os.stat(source)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return 0, 0
+
+def _load_map_rows(name):
+    try:
+        from . import maps
+    except Exception:
+        import maps
+    return list(getattr(maps, name))
+
+def build_world_file(name="map1", directory=None, fractions=BOSS_MARKER_FRACTIONS):
+    # Compile map `name` from maps.py and write it atomically; return the file contents
+    data = compile_world(_load_map_rows(name), fractions, _source_stat())
+    path = world_path(name, directory)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return data
+
+
+# --- Load ---
+def _parse_header(buffer):
+    # Return header fields as a dict, or None if the buffer isn't a world file of this version
+    if len(buffer) < _HEADER.size:
+        return None
+    magic, version, _, width, height, mtime_ns, size, markers = _HEADER.unpack_from(buffer, 0)
+    if magic != WORLD_MAGIC or version != WORLD_VERSION:
+        return None
+    if len(buffer) != _HEADER.size + height * 4 + width * height * 5:
+        return None
+    return {'width': width, 'height': height, 'source_stat': (mtime_ns, size), 'markers': markers}
+
+def open_world(buffer):
+    # Wrap world file contents (bytes or mmap) as (GlyphLayer, TileGrid) without copying the layers
+    header = _parse_header(buffer)
+    if header is None:
+        raise ValueError("not a compiled world file")
+    width, height = header['width'], header['height']
+    row_lengths = struct.unpack_from(f'<{height}I', buffer, _HEADER.size)
+    glyph_offset = _HEADER.size + height * 4
+    tile_offset = glyph_offset + width * height * 4
+    glyphs = GlyphLayer(buffer, glyph_offset, width, row_lengths)
+    tiles = TileGrid(width, height, memoryview(buffer)[tile_offset:tile_offset + width * height])
+    return glyphs, tiles
+
+def _is_current(header, fractions):
+    return header is not None and header['source_stat'] == _source_stat() and header['markers'] == _markers_checksum(fractions)
+
+def load_world(name="map1", directory=None, fractions=BOSS_MARKER_FRACTIONS):
+    # Return (map rows, tile grid, note) for map `name`; note is None, or a message for the caller to show
+    # Steps:
+    #  - Memory-map the compiled world file if it matches the current maps.py (mtime/size) and markers
+    #  - Otherwise recompile and rewrite it; if the file can't be written, use the compiled bytes directly (and say so in note)
+    #  - The map is mapped copy-on-write so in-game tile edits (e.g. defeated bosses) never touch the file
+    path = world_path(name, directory)
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        if _is_current(_parse_header(buffer), fractions):
+            return open_world(buffer) + (None,)
+        buffer.close()
+    except (OSError, ValueError):
+        pass
+    try:
+        build_world_file(name, directory, fractions)
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        return open_world(buffer) + (None,)
+    except OSError as e:
+        note = f"World cache unavailable ({e}); compiling {name} in memory."
+        return open_world(bytearray(compile_world(_load_map_rows(name), fractions, _source_stat()))) + (note,)
+
+
+if __name__ == "__main__":
+    # Usage: python map_compiler.py [map_name ...]  (defaults to map1); always rebuilds
+    for map_name in sys.argv[1:] or ["map1"]:
+        data = build_world_file(map_name)
+        print(f"Compiled {map_name} -> {world_path(map_name)} ({len(data)} bytes)")
@@ -0,0 +1,53 @@
+# messages.py
+# Timed message log: the last few game messages (hits, misses, level ups, rewards), each shown for a while.
+# The battle and map screens draw the log under their frame every time they render, so showing a message
+# never pauses the game loop the way print() + time.sleep() did: input, enemy AI and drawing keep running
+# and a message simply disappears once its display time is over.
+import time
+from collections import deque
+
+DEFAULT_MESSAGE_TIME = 2.0  # seconds a message stays up unless add() is given a duration
+
+
+class MessageLog:
+    def __init__(self, capacity=4, clock=None):
+        # 1) A ring buffer of (expires_at, text); adding to a full log pushes out the oldest message.
+        # 2) `clock` returns the current time in seconds (default time.monotonic, looked up on each call).
+        self.capacity = capacity
+        self.clock = clock
+        self.entries = deque(maxlen=capacity)
+
+    def _now(self):
+        return self.clock() if self.clock else time.monotonic()
+
+    def add(self, text, duration=DEFAULT_MESSAGE_TIME):
+        self.entries.append((self._now() + duration, str(text)))
+
+    def clear(self):
+        self.entries.clear()
+
+    def expire(self):
+        # Drop messages whose time is up; entries expire in any order, so rebuild instead of popping from the left
+        now = self._now()
+        if any(expires_at <= now for expires_at, _ in self.entries):
+            live = [entry for entry in self.entries if entry[0] > now]
+            self.entries.clear()
+            self.entries.extend(live)
+
+    def lines(self, pad=False):
+        # Current messages, oldest first; pad=True fills up to `capacity` lines so frames keep the same height
+        self.expire()
+        lines = [text for _, text in self.entries]
+        if pad:
+            lines.extend([""] * (self.capacity - len(lines)))
+        return lines
+
+    def time_to_expiry(self):
+        # Seconds until the next message expires (so a blocking loop knows when to redraw), or None if the log is empty
+        if not self.entries:
+            return None
+        return max(0.0, min(expires_at for expires_at, _ in self.entries) - self._now())
+
+    def __len__(self):
+        self.expire()
+        return len(self.entries)
@@ -6,12 +6,14 @@ import shutil
 
 class MusicController:
     # --- Basic checks and setup ---
-    def __init__(self, tracks):
+    def __init__(self, tracks, log=print):
         # 1) If tracks is None, use empty dict. Otherwise, convert all given paths to absolute paths.
         # 2) Store a list of track names for navigation (next/prev).
         # 3) Initialize state for the main channel: current track, file path, paused flag, and PS process.
         # 4) Initialize state for three additional channels (1, 2, 3) similarly.
         # 5) Locate the PowerShell executable so we can use SoundPlayer to loop WAV files.
+        # 6) `log` receives every status message (print by default; the game routes them into its message log).
+        self.log = log
         self.tracks = {name: os.path.abspath(path) for name, path in (tracks or {}).items()}
         self.track_names = list(self.tracks.keys())
 
@@ -78,7 +80,7 @@ class MusicController:
                 if proc.poll() is None:
                     proc.kill()
             except Exception as e:
-                print(f"Stop failed for {proc_attr}: {e}")
+                self.log(f"Stop failed for {proc_attr}: {e}")
             setattr(self, proc_attr, None)
 
     def _launch_ps_loop(self, path, slot):
@@ -92,7 +94,7 @@ class MusicController:
         # 4) Start PowerShell hidden with no profile, capture stdout/stderr.
         # 5) On success, return the process; on error, print and return None.
         if not self._powershell:
-            print("PowerShell not found.")
+            self.log("PowerShell not found.")
             return None
         safe = path.replace("'", "''")
         # If WAV: continue using System.Media.SoundPlayer for looping
@@ -112,10 +114,10 @@ class MusicController:
                 [self._powershell, "-NoProfile", "-WindowStyle", "Hidden", "-Command", ps_script],
                 stdout=subprocess.PIPE, stderr=subprocess.PIPE
             )
-            print(f"PowerShell loop started for channel {slot}: {path}")
+            self.log(f"PowerShell loop started for channel {slot}: {path}")
             return proc
         except Exception as e:
-            print(f"PowerShell start failed for channel {slot}: {e}")
+            self.log(f"PowerShell start failed for channel {slot}: {e}")
             return None
 
     # --- Generic slot helpers (reduce duplication across channels) ---
@@ -138,7 +140,7 @@ class MusicController:
         paused_attr = attrs['paused_attr']
 
         if name not in self.tracks:
-            print(f"Track '{name}' not configured.")
+            self.log(f"Track '{name}' not configured.")
             return
         path = self.tracks[name]
         if not os.path.exists(path):
@@ -146,12 +148,12 @@ class MusicController:
             if alt:
                 path = os.path.abspath(alt)
                 self.tracks[name] = path
-                print(f"Resolved '{name}' -> {path}")
+                self.log(f"Resolved '{name}' -> {path}")
             else:
-                print(f"File not found for '{name}': {path}")
+                self.log(f"File not found for '{name}': {path}")
                 return
         if not self._is_supported(path):
-            print("Only WAV/MP3 supported:", path)
+            self.log("Only WAV/MP3 supported:", path)
             return
         # stop existing
         self._stop_proc(proc_attr)
@@ -161,7 +163,7 @@ class MusicController:
             setattr(self, track_attr, name)
             setattr(self, path_attr, path)
             setattr(self, paused_attr, False)
-            print(f"Playing track: {name}")
+            self.log(f"Playing track: {name}")
 
     def _stop_slot(self, slot):
         attrs = self._slot_attrs(slot)
@@ -173,18 +175,18 @@ class MusicController:
         setattr(self, track_attr, None)
         setattr(self, path_attr, None)
         setattr(self, paused_attr, False)
-        print(f"Stopped channel {slot}.")
+        self.log(f"Stopped channel {slot}.")
 
     def _pause_slot(self, slot):
         attrs = self._slot_attrs(slot)
         track_attr = attrs['track_attr']
         paused_attr = attrs['paused_attr']
         if not getattr(self, track_attr):
-            print(f"Nothing is playing on channel {slot}.")
+            self.log(f"Nothing is playing on channel {slot}.")
             return
         self._stop_proc(attrs['proc_attr'])
         setattr(self, paused_attr, True)
-        print(f"Paused channel {slot}.")
+        self.log(f"Paused channel {slot}.")
 
     def _resume_slot(self, slot):
         attrs = self._slot_attrs(slot)
@@ -192,10 +194,10 @@ class MusicController:
         paused_attr = attrs['paused_attr']
         path_attr = attrs['path_attr']
         if not getattr(self, track_attr) or not getattr(self, paused_attr):
-            print(f"Nothing to resume on channel {slot}.")
+            self.log(f"Nothing to resume on channel {slot}.")
             return
         if not getattr(self, path_attr) or not os.path.exists(getattr(self, path_attr)):
-            print(f"Cannot resume channel {slot}: file missing.")
+            self.log(f"Cannot resume channel {slot}: file missing.")
             return
         setattr(self, paused_attr, False)
         self._play_slot(slot, getattr(self, track_attr))
@@ -205,7 +207,7 @@ class MusicController:
         track_attr = attrs['track_attr']
         cur = getattr(self, track_attr)
         if not self.track_names or cur not in self.track_names:
-            print(f"No current track on channel {slot} to advance from.")
+            self.log(f"No current track on channel {slot} to advance from.")
             return
         idx = self.track_names.index(cur)
         next_name = self.track_names[(idx + 1) % len(self.track_names)]
@@ -216,7 +218,7 @@ class MusicController:
         track_attr = attrs['track_attr']
         cur = getattr(self, track_attr)
         if not self.track_names or cur not in self.track_names:
-            print(f"No current track on channel {slot} to go back from.")
+            self.log(f"No current track on channel {slot} to go back from.")
             return
         idx = self.track_names.index(cur)
         prev_name = self.track_names[(idx - 1) % len(self.track_names)]
@@ -303,21 +305,21 @@ class MusicController:
         # 1) If no tracks are configured, inform the user and exit.
         # 2) Otherwise, loop through track names with an index and print name -> path for each.
         if not self.track_names:
-            print("No tracks configured.")
+            self.log("No tracks configured.")
             return
         for i, name in enumerate(self.track_names, start=1):
-            print(f"{i}. {name} -> {self.tracks.get(name)}")
+            self.log(f"{i}. {name} -> {self.tracks.get(name)}")
 
     def status(self):
         # 1) Print a header for readability.
         # 2) For each channel (main, 1, 2, 3), print:
         #    a) the current track name or 'stopped'
         #    b) append ' (paused)' if the channel is paused
-        print("=== Channel Status ===")
-        print(f"Main: {self.current_track or 'stopped'}{' (paused)' if self.is_paused else ''}")
-        print(f"Channel1: {self.current_track1 or 'stopped'}{' (paused)' if self.is_paused1 else ''}")
-        print(f"Channel2: {self.current_track2 or 'stopped'}{' (paused)' if self.is_paused2 else ''}")
-        print(f"Channel3: {self.current_track3 or 'stopped'}{' (paused)' if self.is_paused3 else ''}")
+        self.log("=== Channel Status ===")
+        self.log(f"Main: {self.current_track or 'stopped'}{' (paused)' if self.is_paused else ''}")
+        self.log(f"Channel1: {self.current_track1 or 'stopped'}{' (paused)' if self.is_paused1 else ''}")
+        self.log(f"Channel2: {self.current_track2 or 'stopped'}{' (paused)' if self.is_paused2 else ''}")
+        self.log(f"Channel3: {self.current_track3 or 'stopped'}{' (paused)' if self.is_paused3 else ''}")
 
     def stop_all(self):
         # 1) Call stop() for each channel (main, 1, 2, 3).
@@ -326,7 +328,7 @@ class MusicController:
         self.stop1()
         self.stop2()
         self.stop3()
-        print("Stopped all channels.")
+        self.log("Stopped all channels.")
 
     def get_track_index(self):
         # 1) If a current track exists and is in the track list, return its index.
@@ -343,4 +345,4 @@ class MusicController:
             name = self.track_names[index]
             self.play(name)
         else:
-            print("Invalid track index.")
+            self.log("Invalid track index.")
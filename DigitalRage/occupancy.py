@@ -0,0 +1,110 @@
+# occupancy.py
+# Battle occupancy grid: a spatial hash from arena cell to the enemies covering it.
+# Every cell of an enemy's size_width x size_height footprint is recorded, so collision, adjacency and
+# nearest-target queries look at a few cells around the player instead of comparing every enemy's top-left cell.
+
+
+def enemy_size(enemy):
+    return max(1, int(enemy.get('size_width', 1))), max(1, int(enemy.get('size_height', 1)))
+
+def footprint(enemy, x=None, y=None):
+    # Cells covered by `enemy` (at its own anchor, or at anchor x, y)
+    x = enemy['battle_x'] if x is None else x
+    y = enemy['battle_y'] if y is None else y
+    size_width, size_height = enemy_size(enemy)
+    for offset_y in range(size_height):
+        for offset_x in range(size_width):
+            yield x + offset_x, y + offset_y
+
+def footprint_distance(enemy, px, py, x=None, y=None):
+    # Manhattan distance from (px, py) to the closest cell of the enemy's footprint (0 = standing inside it)
+    x = enemy['battle_x'] if x is None else x
+    y = enemy['battle_y'] if y is None else y
+    size_width, size_height = enemy_size(enemy)
+    dx = max(x - px, 0, px - (x + size_width - 1))
+    dy = max(y - py, 0, py - (y + size_height - 1))
+    return dx + dy
+
+
+class OccupancyGrid:
+    def __init__(self, width, height):
+        # cells: (x, y) -> list of enemies covering that cell; empty cells have no entry
+        # members: every enemy on the grid, in the order added
+        self.width = width
+        self.height = height
+        self.cells = {}
+        self.members = []
+
+    # --- Updates ---
+    def add(self, enemy):
+        self.members.append(enemy)
+        self._place(enemy)
+
+    def remove(self, enemy):
+        if enemy in self.members:
+            self.members.remove(enemy)
+            self._unplace(enemy)
+
+    def move(self, enemy, x, y):
+        # Re-anchor an enemy and update the cells it covers
+        self._unplace(enemy)
+        enemy['battle_x'], enemy['battle_y'] = x, y
+        self._place(enemy)
+
+    def _place(self, enemy):
+        for cell in footprint(enemy):
+            self.cells.setdefault(cell, []).append(enemy)
+
+    def _unplace(self, enemy):
+        for cell in footprint(enemy):
+            occupants = self.cells.get(cell)
+            if occupants and enemy in occupants:
+                occupants.remove(enemy)
+                if not occupants:
+                    del self.cells[cell]
+
+    # --- Queries ---
+    def at(self, x, y):
+        return self.cells.get((x, y), ())
+
+    def blocked(self, x, y):
+        return (x, y) in self.cells
+
+    def ring(self, x, y, radius):
+        # Cells at exactly Manhattan distance `radius` from (x, y)
+        if radius == 0:
+            yield x, y
+            return
+        for dx in range(-radius, radius + 1):
+            dy = radius - abs(dx)
+            yield x + dx, y + dy
+            if dy:
+                yield x + dx, y - dy
+
+    def near(self, x, y, radius=1):
+        # Enemies with any footprint cell within `radius` of (x, y), closest first (no duplicates)
+        found = []
+        for r in range(radius + 1):
+            for cell in self.ring(x, y, r):
+                for enemy in self.cells.get(cell, ()):
+                    if enemy not in found:
+                        found.append(enemy)
+        return found
+
+    def nearest(self, x, y, max_radius=None):
+        # (enemy, distance) for the closest occupied cell, searching outward ring by ring; (None, None) if empty
+        # Once a ring has more cells than there are enemies, checking each enemy's footprint directly is cheaper
+        if not self.members:
+            return None, None
+        if max_radius is None:
+            max_radius = self.width + self.height
+        for r in range(max_radius + 1):
+            if 4 * r > len(self.members):
+                enemy = min(self.members, key=lambda e: footprint_distance(e, x, y))
+                distance = footprint_distance(enemy, x, y)
+                return (enemy, distance) if distance <= max_radius else (None, None)
+            for cell in self.ring(x, y, r):
+                occupants = self.cells.get(cell)
+                if occupants:
+                    return occupants[0], r
+        return None, None
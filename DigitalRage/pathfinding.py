@@ -0,0 +1,120 @@
+# pathfinding.py
+# Flow-field pathfinding for battle enemies.
+# One breadth-first search from the player's cell gives every arena cell its walking distance to the player
+# (around obstacles); each enemy then just steps to the neighbouring cell with the smallest distance.
+# The search runs once per player position and enemy size, however many enemies are chasing.
+from collections import deque
+
+UNREACHABLE = 1 << 30
+# Neighbouring anchors an enemy may step to; diagonals first since they close the most distance
+STEPS = ((-1, -1), (1, -1), (-1, 1), (1, 1), (0, -1), (-1, 0), (1, 0), (0, 1))
+
+
+class FlowField:
+    def __init__(self, width, height, blocked=()):
+        # 1) `blocked` cells (obstacles) are never entered; cells outside the arena count as blocked.
+        # 2) Distances are per enemy size and per anchor (top-left) cell: the number of 4-neighbour steps until the
+        #    enemy's footprint would cover the target, so 1 means "adjacent" and 0 "on top of the target".
+        #    Anchors where the footprint doesn't fit are UNREACHABLE, so big enemies path around narrow gaps.
+        # 3) An arena without obstacles needs no search: the distance is the plain Manhattan distance (`open`).
+        # 4) `builds` counts searches, so callers can check the field is only rebuilt when the target moves.
+        self.width = width
+        self.height = height
+        self.blocked = bytearray(width * height)
+        for x, y in blocked:
+            if 0 <= x < width and 0 <= y < height:
+                self.blocked[y * width + x] = 1
+        self.open = not any(self.blocked)
+        self.target = None
+        self.builds = 0
+        self._fits = {}   # (size_width, size_height) -> bytearray, 1 where that footprint fits
+        self._fields = {}  # (size_width, size_height) -> distance list for the current target
+
+    def is_blocked(self, x, y):
+        return not (0 <= x < self.width and 0 <= y < self.height) or bool(self.blocked[y * self.width + x])
+
+    def update(self, x, y):
+        # Point the field at target cell (x, y); searches only rerun if the target changed. Returns True if it moved.
+        if self.target == (x, y):
+            return False
+        self.target = (x, y)
+        self._fields.clear()
+        return True
+
+    # --- Build ---
+    def _fit_mask(self, size_width, size_height):
+        fits = self._fits.get((size_width, size_height))
+        if fits is None:
+            fits = bytearray(self.width * self.height)
+            for y in range(self.height - size_height + 1):
+                for x in range(self.width - size_width + 1):
+                    if not any(self.blocked[(y + offset_y) * self.width + x + offset_x]
+                               for offset_y in range(size_height) for offset_x in range(size_width)):
+                        fits[y * self.width + x] = 1
+            self._fits[(size_width, size_height)] = fits
+        return fits
+
+    def distances(self, size_width=1, size_height=1):
+        # Distance list (index y * width + x) for anchors of this size, searched from every anchor covering the target
+        field = self._fields.get((size_width, size_height))
+        if field is not None:
+            return field
+        width = self.width
+        size = width * self.height
+        fits = self._fit_mask(size_width, size_height)
+        field = [UNREACHABLE] * size
+        queue = deque()
+        tx, ty = self.target
+        for y in range(max(0, ty - size_height + 1), ty + 1):
+            for x in range(max(0, tx - size_width + 1), tx + 1):
+                i = y * width + x
+                if fits[i]:
+                    field[i] = 0
+                    queue.append(i)
+        while queue:
+            i = queue.popleft()
+            d = field[i] + 1
+            column = i % width
+            if column > 0 and field[i - 1] == UNREACHABLE and fits[i - 1]:
+                field[i - 1] = d
+                queue.append(i - 1)
+            if column < width - 1 and field[i + 1] == UNREACHABLE and fits[i + 1]:
+                field[i + 1] = d
+                queue.append(i + 1)
+            if i >= width and field[i - width] == UNREACHABLE and fits[i - width]:
+                field[i - width] = d
+                queue.append(i - width)
+            if i + width < size and field[i + width] == UNREACHABLE and fits[i + width]:
+                field[i + width] = d
+                queue.append(i + width)
+        self._fields[(size_width, size_height)] = field
+        self.builds += 1
+        return field
+
+    # --- Queries ---
+    def distance(self, x, y, size_width=1, size_height=1):
+        if not (0 <= x <= self.width - size_width and 0 <= y <= self.height - size_height):
+            return UNREACHABLE
+        if self.open:
+            tx, ty = self.target
+            return max(x - tx, 0, tx - (x + size_width - 1)) + max(y - ty, 0, ty - (y + size_height - 1))
+        return self.distances(size_width, size_height)[y * self.width + x]
+
+    def next_step(self, x, y, size_width=1, size_height=1, occupied=None):
+        # Anchor an enemy at (x, y) should move to: the neighbour closest to the target that is reachable,
+        # doesn't cover the target itself and (if `occupied(x, y)` is given) isn't taken by another enemy.
+        # Diagonal steps can't cut past a blocked corner. Returns (x, y) unchanged when no step gets closer.
+        best = (x, y)
+        best_distance = self.distance(x, y, size_width, size_height)
+        for dx, dy in STEPS:
+            nx, ny = x + dx, y + dy
+            d = self.distance(nx, ny, size_width, size_height)
+            if d >= best_distance or d == 0:
+                continue
+            if dx and dy and (self.distance(nx, y, size_width, size_height) == UNREACHABLE
+                              or self.distance(x, ny, size_width, size_height) == UNREACHABLE):
+                continue
+            if occupied is not None and occupied(nx, ny):
+                continue
+            best, best_distance = (nx, ny), d
+        return best
@@ -0,0 +1,202 @@
+# player.py
+# Player stats as a fixed-field object (__slots__) instead of a free-form dict.
+# Derived numbers read every frame (next level's EXP threshold, effective attack/defence) are cached and only
+# recomputed when the level, base stats or equipment change.
+# Still usable like the dict it replaced (stats['HP'], stats.get('exp'), update(), ...) and saved in the same JSON shape.
+from bisect import bisect_right
+
+MAX_LEVEL = 999  # highest level the EXP table goes to (the thresholds grow 20% per level, so this is astronomically far)
+
+
+def exp_needed_for_level(level):
+    # Calculate exponential experience requirement: 100 * 1.2^(level-1)
+    if level <= 1:
+        return 0
+    return int(100 * (1.2 ** (level - 1)))
+
+# EXP threshold table: _EXP_TABLE[i] = exp_needed_for_level(i + 1), filled in on demand up to MAX_LEVEL
+_EXP_TABLE = [0]
+
+def _extend_exp_table(level=None, exp=None):
+    # Grow the table until it covers `level` or passes `exp` (doubling its length each time)
+    while len(_EXP_TABLE) < MAX_LEVEL and ((level is not None and len(_EXP_TABLE) < level)
+                                           or (exp is not None and _EXP_TABLE[-1] <= exp)):
+        for next_level in range(len(_EXP_TABLE) + 1, min(MAX_LEVEL, 2 * len(_EXP_TABLE)) + 1):
+            _EXP_TABLE.append(exp_needed_for_level(next_level))
+
+def exp_threshold(level):
+    # Cached exp_needed_for_level(level); levels past MAX_LEVEL can't be reached
+    if level > MAX_LEVEL:
+        return float('inf')
+    if level > len(_EXP_TABLE):
+        _extend_exp_table(level=level)
+    return _EXP_TABLE[max(level, 1) - 1]
+
+def level_for_exp(exp):
+    # Highest level whose threshold `exp` has reached, found by bisecting the table (O(log n), any number of levels at once)
+    _extend_exp_table(exp=exp)
+    return max(1, bisect_right(_EXP_TABLE, exp))
+
+def level_stats(level):
+    # Attack and defence for a level: base 12/5, +0.5 attack and +0.2 defence per level
+    base_attack = 12
+    base_defence = 5
+    attack_per_level = 0.5
+    defence_per_level = 0.2
+    return base_attack + int((level - 1) * attack_per_level), base_defence + int((level - 1) * defence_per_level)
+
+
+class PlayerStats:
+    # Save keys, in save order; anything else found in a save is kept in `extra` and written back unchanged
+    FIELDS = ('x', 'y', 'HP', 'max_hp', 'attack', 'defence', 'Level', 'steps', 'exp', 'munny', 'items', 'equipment')
+    DEFAULTS = {'x': 40, 'y': 30, 'HP': 120, 'max_hp': 120, 'attack': 12, 'defence': 5, 'Level': 1,
+                'steps': 0, 'exp': 0, 'munny': 0}
+    __slots__ = ('x', 'y', 'HP', 'max_hp', 'steps', 'exp', 'munny', 'items', 'extra',
+                 '_level', '_attack', '_defence', '_equipment', '_next_level_exp', '_effective')
+
+    def __init__(self, **fields):
+        # Start from DEFAULTS; `fields` override them (unknown keys go to `extra`)
+        self.clear()
+        self.update(fields)
+
+    # --- Fields that feed cached values ---
+    # Level, attack, defence and equipment are properties so that changing them drops the cached values
+    @property
+    def Level(self):
+        return self._level
+
+    @Level.setter
+    def Level(self, value):
+        self._level = value
+        self._next_level_exp = None
+
+    @property
+    def attack(self):
+        return self._attack
+
+    @attack.setter
+    def attack(self, value):
+        self._attack = value
+        self._effective = None
+
+    @property
+    def defence(self):
+        return self._defence
+
+    @defence.setter
+    def defence(self, value):
+        self._defence = value
+        self._effective = None
+
+    @property
+    def equipment(self):
+        # slot -> {'attack': bonus, 'defence': bonus}; change it through equip()/unequip()
+        return self._equipment
+
+    @equipment.setter
+    def equipment(self, value):
+        self._equipment = dict(value or {})
+        self._effective = None
+
+    def equip(self, slot, bonuses):
+        self._equipment[slot] = dict(bonuses)
+        self._effective = None
+
+    def unequip(self, slot):
+        self._equipment.pop(slot, None)
+        self._effective = None
+
+    # --- Cached derived values ---
+    @property
+    def next_level_exp(self):
+        # EXP needed to reach the next level
+        if self._next_level_exp is None:
+            self._next_level_exp = exp_threshold(self._level + 1)
+        return self._next_level_exp
+
+    def _effective_stats(self):
+        if self._effective is None:
+            attack, defence = self._attack, self._defence
+            for bonuses in self._equipment.values():
+                attack += bonuses.get('attack', 0)
+                defence += bonuses.get('defence', 0)
+            self._effective = (attack, defence)
+        return self._effective
+
+    @property
+    def effective_attack(self):
+        # Attack including equipment bonuses
+        return self._effective_stats()[0]
+
+    @property
+    def effective_defence(self):
+        return self._effective_stats()[1]
+
+    # --- Dict-style access ---
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        return key in self.FIELDS or key in self.extra
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        # No items() method: `items` is the player's item list, so copy with keys() + [] as dict.update does
+        return list(self.FIELDS) + list(self.extra)
+
+    def get(self, key, default=None):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        return self.extra.get(key, default)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, other=(), **fields):
+        # Same as dict.update: copy keys from a mapping (dict or PlayerStats), (key, value) pairs or keyword arguments
+        if hasattr(other, 'keys'):
+            other = [(key, other[key]) for key in other.keys()]
+        for key, value in other:
+            self[key] = value
+        for key, value in fields.items():
+            self[key] = value
+
+    def clear(self):
+        # Back to a new player's stats
+        for key, value in self.DEFAULTS.items():
+            setattr(self, key, value)
+        self.items = []
+        self.equipment = {}
+        self.extra = {}
+
+    # --- Save format ---
+    def to_json(self):
+        # The save file's player_stats object (equipment only appears once something is equipped)
+        data = {key: getattr(self, key) for key in self.FIELDS if key != 'equipment'}
+        if self._equipment:
+            data['equipment'] = self._equipment
+        data.update(self.extra)
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        # Build from a save's player_stats object; saves without max_hp treat their HP as the maximum
+        stats = cls(**data)
+        if 'max_hp' not in data:
+            stats.max_hp = data.get('HP', stats.max_hp)
+        return stats
+
+    def __repr__(self):
+        return repr(self.to_json())
@@ -0,0 +1,139 @@
+# recording.py
+# Session recording ("casts"): store what the game shows as timestamped per-frame cell deltas, and replay it.
+#
+# Cast file: gzip-compressed JSON lines.
+#   line 1:  {"format": "tfbd-cast", "version": 1, "started": <unix time>}
+#   frame:   [dt_ms, "f", <row count>, [[row, column, text, clear_tail], ...]]   (edits from diff_rows)
+#   text:    [dt_ms, "t", message]
+#   clear:   [dt_ms, "c"]
+# dt_ms is the time since the previous event, so long sessions stay small.
+import sys
+import gzip
+import json
+import time
+try:
+    from .screen import diff_rows
+    from .renderer import Renderer, TerminalRenderer
+except Exception:
+    from screen import diff_rows
+    from renderer import Renderer, TerminalRenderer
+
+CAST_FORMAT = "tfbd-cast"
+CAST_VERSION = 1
+
+
+class CastRecorder(Renderer):
+    def __init__(self, backend, path, clock=time.monotonic):
+        # 1) Forward everything to `backend` (e.g. the terminal) and also record it to `path`.
+        # 2) Each frame is stored as the edits against the previous recorded frame, not a full screen.
+        self.backend = backend
+        self.clock = clock
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._file.write(json.dumps({"format": CAST_FORMAT, "version": CAST_VERSION, "started": time.time()}) + "\n")
+        self._last_rows = []
+        self._last_time = clock()
+
+    def _write(self, *event):
+        now = self.clock()
+        dt_ms = int(round((now - self._last_time) * 1000))
+        self._last_time = now
+        self._file.write(json.dumps([dt_ms, *event], ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def present(self, lines):
+        rows = list(lines)
+        edits = [list(edit) for edit in diff_rows(self._last_rows, rows)]
+        if edits or len(rows) != len(self._last_rows):
+            self._write("f", len(rows), edits)
+        self._last_rows = rows
+        self.backend.present(lines)
+
+    def text(self, message):
+        self._write("t", message)
+        self.backend.text(message)
+
+    def clear(self):
+        self._write("c")
+        self._last_rows = []
+        self.backend.clear()
+
+    def invalidate(self):
+        self.backend.invalidate()
+
+    def flush(self):
+        self._file.flush()
+        self.backend.flush()
+
+    def close(self):
+        self._file.close()
+        self.backend.close()
+
+
+# --- Reading / replay ---
+def read_cast(path):
+    # Yield (time_seconds, kind, payload) events; a truncated file (e.g. after a crash) ends the stream quietly
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            header = json.loads(f.readline())
+            if header.get("format") != CAST_FORMAT or header.get("version") != CAST_VERSION:
+                raise ValueError(f"{path} is not a version {CAST_VERSION} cast file")
+            elapsed = 0.0
+            for line in f:
+                event = json.loads(line)
+                elapsed += event[0] / 1000.0
+                yield elapsed, event[1], event[2:]
+        except (EOFError, json.JSONDecodeError):
+            return
+
+def apply_edits(rows, row_count, edits):
+    # Rebuild a frame from the previous rows and a frame event's edits
+    rows = list(rows[:row_count]) + [""] * (row_count - len(rows))
+    for row, column, text, clear_tail in edits:
+        old = rows[row]
+        rows[row] = old[:column] + text + ("" if clear_tail else old[column + len(text):])
+    return rows
+
+def play_cast(path, renderer=None, speed=1.0):
+    # Replay a cast through `renderer` (terminal by default)
+    # Steps:
+    #  - Rebuild each frame from its deltas and present it
+    #  - Wait between events by their recorded gap divided by `speed` (speed <= 0 plays as fast as possible)
+    renderer = renderer or TerminalRenderer()
+    rows = []
+    start = time.monotonic()
+    for at, kind, payload in read_cast(path):
+        if speed > 0:
+            delay = start + at / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        if kind == "f":
+            rows = apply_edits(rows, payload[0], payload[1])
+            renderer.present(rows)
+        elif kind == "t":
+            renderer.text(payload[0])
+        elif kind == "c":
+            rows = []
+            renderer.clear()
+    renderer.flush()
+
+def cast_info(path):
+    # Summary numbers for a cast: duration, frame/message counts and total edited characters
+    info = {'duration': 0.0, 'frames': 0, 'messages': 0, 'edited_chars': 0}
+    for at, kind, payload in read_cast(path):
+        info['duration'] = at
+        if kind == "f":
+            info['frames'] += 1
+            info['edited_chars'] += sum(len(edit[2]) for edit in payload[1])
+        elif kind == "t":
+            info['messages'] += 1
+    return info
+
+
+if __name__ == "__main__":
+    # Usage: python recording.py play <file.cast> [speed]   |   python recording.py info <file.cast>
+    if len(sys.argv) >= 3 and sys.argv[1] == "play":
+        play_cast(sys.argv[2], speed=float(sys.argv[3]) if len(sys.argv) > 3 else 1.0)
+    elif len(sys.argv) >= 3 and sys.argv[1] == "info":
+        for key, value in cast_info(sys.argv[2]).items():
+            print(f"{key}: {value}")
+    else:
+        print("Usage: python recording.py play <file.cast> [speed] | info <file.cast>")
@@ -0,0 +1,195 @@
+# renderer.py
+# Pluggable output backends. The game draws through one Renderer:
+#  - TerminalRenderer: real console output via the differential ScreenBuffer
+#  - NullRenderer: discards everything (headless runs and benchmarks)
+#  - CaptureRenderer: keeps frames and messages in memory so output can be inspected or asserted
+#  - ThreadedRenderer: hands frames to another backend on a render thread so slow consoles never stall the game
+import threading
+from collections import deque
+try:
+    from .screen import ScreenBuffer
+except Exception:
+    from screen import ScreenBuffer
+
+
+class Renderer:
+    # --- Interface ---
+    # present(lines): show a full frame (list of row strings), replacing the previous one
+    # text(message):  show a line of message text under the current frame (what print() used to do)
+    # clear():        blank the screen
+    # invalidate():   something else wrote to the terminal (e.g. an input() prompt); the next frame repaints fully
+    # flush():        wait until everything sent so far is actually shown (e.g. before a blocking input() prompt)
+    # close():        release any resources (threads, files)
+    def present(self, lines):
+        raise NotImplementedError
+
+    def text(self, message):
+        raise NotImplementedError
+
+    def clear(self):
+        pass
+
+    def invalidate(self):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TerminalRenderer(Renderer):
+    def __init__(self, stream=None):
+        # Frames go through a ScreenBuffer so only changed cells are written
+        self.screen = ScreenBuffer(stream)
+
+    def present(self, lines):
+        self.screen.present(lines)
+
+    def text(self, message):
+        self.screen.text(message)
+
+    def clear(self):
+        self.screen.clear()
+
+    def invalidate(self):
+        self.screen.invalidate()
+
+
+class NullRenderer(Renderer):
+    def __init__(self):
+        # Only count what would have been drawn
+        self.frames = 0
+        self.messages = 0
+
+    def present(self, lines):
+        self.frames += 1
+
+    def text(self, message):
+        self.messages += 1
+
+
+class CaptureRenderer(Renderer):
+    def __init__(self, max_events=None):
+        # 1) `events` holds ('frame', rows), ('text', message) and ('clear', None) in output order.
+        # 2) max_events (optional) keeps only the newest events so long runs stay bounded.
+        self.events = deque(maxlen=max_events)
+
+    def _record(self, kind, value):
+        self.events.append((kind, value))
+
+    def present(self, lines):
+        self._record('frame', tuple(lines))
+
+    def text(self, message):
+        self._record('text', message)
+
+    def clear(self):
+        self._record('clear', None)
+
+    @property
+    def frames(self):
+        return [value for kind, value in self.events if kind == 'frame']
+
+    @property
+    def messages(self):
+        return [value for kind, value in self.events if kind == 'text']
+
+    @property
+    def last_frame(self):
+        for kind, value in reversed(self.events):
+            if kind == 'frame':
+                return value
+        return None
+
+
+class ThreadedRenderer(Renderer):
+    def __init__(self, backend, max_frames=2):
+        # 1) Wrap another backend; a daemon render thread does all of its drawing.
+        # 2) present() snapshots the frame (tuple) and queues it; at most `max_frames` frames wait at once.
+        # 3) When the queue is full the oldest waiting frame is dropped (it would be overdrawn anyway);
+        #    text, clear and invalidate events are never dropped and keep their order relative to frames.
+        self.backend = backend
+        self.max_frames = max(1, max_frames)
+        self.dropped = 0
+        self._queue = deque()
+        self._frames = 0
+        self._busy = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="render", daemon=True)
+        self._thread.start()
+
+    # --- Producer side (game thread) ---
+    def _put(self, kind, value):
+        with self._cond:
+            if self._closed:
+                return
+            if kind == 'frame':
+                if self._frames >= self.max_frames:
+                    for index, (queued_kind, _) in enumerate(self._queue):
+                        if queued_kind == 'frame':
+                            del self._queue[index]
+                            break
+                    self._frames -= 1
+                    self.dropped += 1
+                self._frames += 1
+            self._queue.append((kind, value))
+            self._cond.notify_all()
+
+    def present(self, lines):
+        self._put('frame', tuple(lines))
+
+    def text(self, message):
+        self._put('text', message)
+
+    def clear(self):
+        self._put('clear', None)
+
+    def invalidate(self):
+        self._put('invalidate', None)
+
+    def flush(self):
+        # Block until the render thread has drawn everything queued so far
+        with self._cond:
+            while (self._queue or self._busy) and self._thread.is_alive():
+                self._cond.wait(0.1)
+        self.backend.flush()
+
+    def close(self):
+        # Draw what is still queued, stop the thread and close the wrapped backend
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.backend.close()
+
+    # --- Consumer side (render thread) ---
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                kind, value = self._queue.popleft()
+                if kind == 'frame':
+                    self._frames -= 1
+                self._busy = True
+            try:
+                if kind == 'frame':
+                    self.backend.present(value)
+                elif kind == 'text':
+                    self.backend.text(value)
+                elif kind == 'invalidate':
+                    self.backend.invalidate()
+                else:
+                    self.backend.clear()
+            except Exception:
+                # A failed draw must not kill the render thread; the next frame repaints anyway
+                pass
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
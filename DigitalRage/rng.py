@@ -0,0 +1,56 @@
+# rng.py
+# Seeded random number streams, one per game subsystem.
+# Random encounters, combat rolls and loot drops each draw from their own random.Random, all derived from one
+# master seed, so the same seed and the same inputs replay the same game, and drawing more combat rolls
+# (e.g. a longer fight) doesn't shift which drops come up later.
+# The stream seeds are written to the save file; loading one continues the streams where the save left them.
+import random
+
+STREAMS = ('encounter', 'combat', 'loot')
+
+
+def derive_seed(seed, name):
+    # Stable 64-bit seed for stream `name` under master `seed` (str seeds hash the same on every run and platform)
+    return random.Random(f"{seed}:{name}").getrandbits(64)
+
+
+class RandomStreams:
+    def __init__(self, seed=None):
+        # seed=None picks a fresh master seed; read it back from `seed` to replay the run
+        self.reseed(seed)
+
+    def reseed(self, seed=None):
+        # Restart every stream from master `seed`
+        self.seed = random.getrandbits(63) if seed is None else seed
+        self.streams = {name: random.Random(derive_seed(self.seed, name)) for name in STREAMS}
+
+    @property
+    def encounter(self):
+        return self.streams['encounter']
+
+    @property
+    def combat(self):
+        return self.streams['combat']
+
+    @property
+    def loot(self):
+        return self.streams['loot']
+
+    # --- Save format ---
+    def checkpoint(self):
+        # Save-file data: the master seed plus a fresh seed for each stream.
+        # Each stream draws its new seed from itself and is reseeded with it, so the running game and a game
+        # loaded from this save continue with the same numbers (without storing the full generator state).
+        seeds = {}
+        for name, stream in self.streams.items():
+            seeds[name] = stream.getrandbits(64)
+            stream.seed(seeds[name])
+        return {'seed': self.seed, 'streams': seeds}
+
+    def restore(self, data):
+        # Continue from checkpoint() data; streams missing from it (older saves) start fresh from the master seed
+        data = data or {}
+        self.reseed(data.get('seed'))
+        for name, stream_seed in data.get('streams', {}).items():
+            if name in self.streams:
+                self.streams[name].seed(stream_seed)
@@ -0,0 +1,39 @@
+# scheduler.py
+# Enemy AI scheduler: each enemy thinks on its own timer instead of every enemy acting on one shared clock.
+# Enemies sit in a heap ordered by when they are next due. Each frame, run() hands due enemies to a think
+# callback, most overdue first, until none are due or the frame's time budget is spent. Enemies skipped by
+# the budget stay at the front of the heap for the next frame, so a crowded fight slows its enemies down a little
+# instead of making every frame late.
+import heapq
+import itertools
+import time
+
+
+class AIScheduler:
+    def __init__(self):
+        # heap of (due_time, order, enemy); `order` keeps same-time entries first-come-first-served
+        self.heap = []
+        self.order = itertools.count()
+
+    def add(self, enemy, due):
+        heapq.heappush(self.heap, (due, next(self.order), enemy))
+
+    def __len__(self):
+        return len(self.heap)
+
+    def run(self, now, think, budget=None):
+        # Run every enemy due at or before `now`: think(enemy, due) returns the enemy's next due time, or None to drop it
+        # budget: seconds of real time this call may spend (None = no limit, which keeps headless runs deterministic)
+        # Returns how many think calls ran
+        deadline = None if budget is None else time.perf_counter() + budget
+        heap = self.heap
+        runs = 0
+        while heap and heap[0][0] <= now:
+            if deadline is not None and runs and time.perf_counter() >= deadline:
+                break
+            due, _, enemy = heapq.heappop(heap)
+            next_due = think(enemy, due)
+            runs += 1
+            if next_due is not None:
+                heapq.heappush(heap, (next_due, next(self.order), enemy))
+        return runs
@@ -0,0 +1,122 @@
+# screen.py
+# Differential ANSI screen renderer: keeps the last frame and only rewrites the cells that changed.
+import os
+import sys
+import shutil
+
+CSI = "\x1b["
+
+
+def _common_prefix_len(a, b):
+    # Number of leading characters two rows share
+    limit = min(len(a), len(b))
+    i = 0
+    while i < limit and a[i] == b[i]:
+        i += 1
+    return i
+
+def _common_suffix_len(a, b, prefix):
+    # Number of trailing characters two equal-length rows share, not overlapping the prefix
+    limit = len(a) - prefix
+    i = 0
+    while i < limit and a[-1 - i] == b[-1 - i]:
+        i += 1
+    return i
+
+def diff_rows(old, new):
+    # Yield (row, column, text, clear_tail) edits that turn frame `old` into frame `new`
+    # Steps:
+    #  - Unchanged rows are skipped (identical strings compare in O(1))
+    #  - Same-length rows rewrite only the span between common prefix and suffix
+    #  - Rows that changed length rewrite from the first difference and erase the rest of the line
+    #  - Rows past the end of `old` are written whole and erase the rest of the line (something unknown may be there)
+    #  - Rows past the end of `new` are left to the caller (ScreenBuffer erases below the frame)
+    for row in range(len(new)):
+        new_row = new[row]
+        old_row = old[row] if row < len(old) else None
+        if new_row == old_row:
+            continue
+        if old_row is None:
+            yield row, 0, new_row, True
+            continue
+        prefix = _common_prefix_len(old_row, new_row)
+        if len(old_row) == len(new_row):
+            suffix = _common_suffix_len(old_row, new_row, prefix)
+            yield row, prefix, new_row[prefix:len(new_row) - suffix], False
+        else:
+            yield row, prefix, new_row[prefix:], len(new_row) < len(old_row)
+
+
+class ScreenBuffer:
+    # --- Basic setup ---
+    def __init__(self, stream=None):
+        # 1) Write to the given stream (stdout by default).
+        # 2) `last` holds the last frame shown; None means the screen contents are unknown (full repaint).
+        # 3) On Windows, an empty os.system call switches the console into ANSI (VT) mode once.
+        self.stream = stream or sys.stdout
+        self.last = None
+        self.size = None
+        if os.name == "nt":
+            os.system("")
+
+    def invalidate(self):
+        # Forget the last frame so the next present() repaints everything
+        self.last = None
+
+    def clear(self):
+        # Blank the screen and home the cursor; plain print() output then starts at the top
+        self.stream.write(f"{CSI}H{CSI}2J")
+        self.stream.flush()
+        self.last = []
+
+    # --- Frame output ---
+    def render(self, lines):
+        # Return the escape sequence text that updates the screen from the last frame to `lines`
+        # Steps:
+        #  - Frames taller than the terminal keep their bottom rows (what scrolling print used to leave visible)
+        #  - Repaint fully when the last frame is unknown or the terminal was resized
+        #  - Otherwise move the cursor only to changed spans and write just those characters
+        #  - Finish with the cursor under the frame, erasing any leftover text below it
+        size = shutil.get_terminal_size((80, 24))
+        max_rows = max(1, size.lines - 1)
+        lines = list(lines[-max_rows:])
+        out = []
+        if self.last is None or size != self.size:
+            out.append(f"{CSI}H{CSI}2J")
+            old = []
+        else:
+            old = self.last
+        for row, column, text, clear_tail in diff_rows(old, lines):
+            out.append(f"{CSI}{row + 1};{column + 1}H{text}")
+            if clear_tail:
+                out.append(f"{CSI}K")
+        out.append(f"{CSI}{len(lines) + 1};1H{CSI}J")
+        self.last = lines
+        self.size = size
+        return "".join(out)
+
+    def text(self, message):
+        # Write message lines at the cursor (under the frame) and keep `last` in step with what the screen shows
+        # Steps:
+        #  - The message rows become part of `last`, so the next frame diffs (and erases) them like frame rows
+        #  - If the rows would scroll the terminal or wrap, nothing above is where `last` says: repaint next time
+        rows = str(message).split("\n")
+        self.stream.write(f"{message}\n")
+        self.stream.flush()
+        if self.last is None:
+            return
+        size = shutil.get_terminal_size((80, 24))
+        if size != self.size and self.last:
+            self.last = None
+        elif len(self.last) + len(rows) + 1 > size.lines or any(len(row) >= size.columns for row in rows):
+            self.last = None
+        else:
+            self.last = self.last + rows
+            self.size = size
+
+    def present(self, lines):
+        # Draw a frame (list of row strings) with a single write; return the number of characters written
+        out = self.render(lines)
+        self.stream.write(out)
+        self.stream.flush()
+        return len(out)
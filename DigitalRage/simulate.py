@@ -0,0 +1,162 @@
+# simulate.py
+# Headless Monte Carlo battle simulator for balancing encounters.
+# Plays many BattleEngine fights per player level with a scripted policy, spread over a process pool,
+# and reports win rate, time to kill, damage taken and items used for each level.
+# Nothing is drawn and nothing sleeps: fights advance in fixed ticks of battle time.
+#
+# Usage: python simulate.py [--encounter king] [--levels 1,25,50-99] [--battles 1000] [--policy heal] ...
+import os
+import sys
+import time
+import argparse
+from multiprocessing import Pool
+try:
+    from .battle import create_engine, distance, gate_actions, ENCOUNTERS, INPUT_DELAYS
+    from .player import PlayerStats, level_stats
+    from .rng import RandomStreams
+    from .inventory import Inventory, ITEMS, use_item
+except Exception:
+    from battle import create_engine, distance, gate_actions, ENCOUNTERS, INPUT_DELAYS
+    from player import PlayerStats, level_stats
+    from rng import RandomStreams
+    from inventory import Inventory, ITEMS, use_item
+
+TICK = 0.06  # simulated seconds per tick (the interactive battle frame time)
+MAX_BATTLE_TIME = 600.0  # fights still running after this many simulated seconds count as timeouts
+# Player setup: max HP, starting potions, heal policy threshold (fraction of max HP), fight time limit
+DEFAULT_OPTIONS = {'hp': 120, 'potions': 3, 'heal_below': 0.3, 'max_time': MAX_BATTLE_TIME}
+
+
+# --- Scripted player policies ---
+# A policy looks at the fight and returns the actions it wants this tick; they are rate limited with
+# gate_actions() exactly like key presses in the real game.
+def _step_toward(pos, enemy):
+    dx = enemy['battle_x'] - pos['x']
+    dy = enemy['battle_y'] - pos['y']
+    if dx and abs(dx) >= abs(dy):
+        return 'right' if dx > 0 else 'left'
+    return 'down' if dy > 0 else 'up'
+
+def rush_policy(engine, player, inventory, options):
+    # Walk to the nearest enemy and attack whenever possible
+    pos = engine.player_pos
+    target = engine.nearest_enemy()
+    if target is None:
+        return []
+    if distance(target, pos) <= 1:
+        return ['attack']
+    return [_step_toward(pos, target)]
+
+def heal_policy(engine, player, inventory, options):
+    # Rush, but drink a potion from the quick slots when HP drops below the threshold
+    if player.HP <= player.max_hp * options['heal_below']:
+        for slot in range(min(3, len(inventory))):
+            if inventory.slot_name(slot) == 'potion':
+                return [f'use_item_{slot + 1}']
+    return rush_policy(engine, player, inventory, options)
+
+POLICIES = {'rush': rush_policy, 'heal': heal_policy}
+
+
+# --- Simulation ---
+def simulate_battle(encounter, level, policy, seed, options):
+    # Play one fight; return (outcome, battle seconds, damage taken, items used)
+    attack, defence = level_stats(level)
+    player = PlayerStats(HP=options['hp'], max_hp=options['hp'], attack=attack, defence=defence, Level=level)
+    inventory = Inventory([{'name': 'potion', 'count': options['potions']}] if options['potions'] else [])
+    # Each fight has its own seeded streams, so results don't depend on which worker ran it or in what order
+    streams = RandomStreams(seed)
+    engine = create_engine(encounter, player, rng=streams.combat, loot_rng=streams.loot)
+    choose = POLICIES[policy]
+    gates = {}
+    damage = 0
+    items_used = 0
+    while engine.outcome is None and engine.time < options['max_time']:
+        wanted = [(engine.time, action) for action in choose(engine, player, inventory, options)]
+        actions = []
+        for action in gate_actions(wanted, gates, INPUT_DELAYS):
+            if action.startswith('use_item_'):
+                item_name = inventory.slot_name(int(action.rsplit('_', 1)[-1]) - 1)
+                if item_name and use_item(player, inventory, item_name, ITEMS):
+                    items_used += 1
+            else:
+                actions.append(action)
+        hp_before = player.HP
+        engine.tick(TICK, actions)
+        damage += max(0, hp_before - player.HP)
+    return engine.outcome or 'timeout', engine.time, damage, items_used
+
+def run_batch(task):
+    # Worker entry point: simulate `count` fights at one level and return summed results
+    encounter, level, policy, first_seed, count, options = task
+    totals = {'battles': 0, 'wins': 0, 'timeouts': 0, 'win_time': 0.0, 'damage': 0, 'items': 0}
+    for seed in range(first_seed, first_seed + count):
+        outcome, seconds, damage, items_used = simulate_battle(encounter, level, policy, seed, options)
+        totals['battles'] += 1
+        totals['damage'] += damage
+        totals['items'] += items_used
+        if outcome == 'victory':
+            totals['wins'] += 1
+            totals['win_time'] += seconds
+        elif outcome == 'timeout':
+            totals['timeouts'] += 1
+    return level, totals
+
+def simulate(encounter, levels, battles, policy='heal', options=None, processes=None, seed=0, batch_size=250):
+    # Simulate `battles` fights at each level on a process pool; return {level: totals}
+    options = dict(DEFAULT_OPTIONS, **(options or {}))
+    tasks = []
+    for level in levels:
+        for start in range(0, battles, batch_size):
+            tasks.append((encounter, level, policy, seed + level * 10_000_019 + start, min(batch_size, battles - start), options))
+    results = {level: {'battles': 0, 'wins': 0, 'timeouts': 0, 'win_time': 0.0, 'damage': 0, 'items': 0} for level in levels}
+    with Pool(processes or os.cpu_count()) as pool:
+        for level, totals in pool.imap_unordered(run_batch, tasks):
+            for key, value in totals.items():
+                results[level][key] += value
+    return results
+
+
+# --- Command line ---
+def parse_levels(text):
+    # "1,10,50-60" -> [1, 10, 50, 51, ..., 60]
+    levels = []
+    for part in text.split(','):
+        if '-' in part:
+            low, high = part.split('-', 1)
+            levels.extend(range(int(low), int(high) + 1))
+        elif part.strip():
+            levels.append(int(part))
+    return sorted(set(levels))
+
+def format_report(encounter, policy, results):
+    lines = [f"encounter={encounter} policy={policy}",
+             f"{'level':>5} {'battles':>8} {'win %':>7} {'ttk (s)':>8} {'dmg taken':>10} {'items':>6} {'timeouts':>8}"]
+    for level in sorted(results):
+        r = results[level]
+        n = max(1, r['battles'])
+        ttk = r['win_time'] / r['wins'] if r['wins'] else float('nan')
+        lines.append(f"{level:>5} {r['battles']:>8} {100.0 * r['wins'] / n:>7.1f} {ttk:>8.1f} {r['damage'] / n:>10.1f} {r['items'] / n:>6.2f} {r['timeouts']:>8}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate battles headless and report balance numbers per player level.")
+    parser.add_argument("--encounter", default="king", choices=sorted(ENCOUNTERS))
+    parser.add_argument("--levels", default="1,10,25,50,75,99", help="levels to test, e.g. 1,10,50-60")
+    parser.add_argument("--battles", type=int, default=1000, help="fights per level")
+    parser.add_argument("--policy", default="heal", choices=sorted(POLICIES))
+    parser.add_argument("--hp", type=int, default=DEFAULT_OPTIONS['hp'], help="player max HP")
+    parser.add_argument("--potions", type=int, default=DEFAULT_OPTIONS['potions'])
+    parser.add_argument("--heal-below", type=float, default=DEFAULT_OPTIONS['heal_below'], help="heal policy: HP fraction that triggers a potion")
+    parser.add_argument("--max-time", type=float, default=MAX_BATTLE_TIME, help="simulated seconds before a fight counts as a timeout")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    options = {'hp': args.hp, 'potions': args.potions, 'heal_below': args.heal_below, 'max_time': args.max_time}
+    levels = parse_levels(args.levels)
+    started = time.perf_counter()
+    results = simulate(args.encounter, levels, args.battles, args.policy, options, args.processes, args.seed)
+    elapsed = time.perf_counter() - started
+    print(format_report(args.encounter, args.policy, results))
+    total = sum(r['battles'] for r in results.values())
+    print(f"{total} battles in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f}/s)", file=sys.stderr)
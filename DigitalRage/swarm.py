@@ -0,0 +1,283 @@
+# swarm.py
+# Swarm battles: hundreds or thousands of enemies stored as NumPy arrays (one array per stat) instead of one dict each,
+# so chasing, adjacency checks and hit rolls run vectorized over the whole swarm every tick.
+# SwarmEngine has the same interface as battle.BattleEngine (tick, player_pos, alive_enemies, outcome, rewards),
+# so run_battle() and the simulator drive it unchanged. Boss triggers (triggers.py) are not applied in swarm fights.
+# NumPy is optional: everything else in the game runs without it.
+import time
+import random
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    from .battle import (ENCOUNTERS, BATTLE_WIDTH, BATTLE_HEIGHT, MOVE_DELAY, MAX_TICK,
+                         MOVES, spawn_enemy, spawn_positions, drop_probability, obstacle_cells, think_interval)
+    from .pathfinding import FlowField, STEPS, UNREACHABLE
+except Exception:
+    from battle import (ENCOUNTERS, BATTLE_WIDTH, BATTLE_HEIGHT, MOVE_DELAY, MAX_TICK,
+                        MOVES, spawn_enemy, spawn_positions, drop_probability, obstacle_cells, think_interval)
+    from pathfinding import FlowField, STEPS, UNREACHABLE
+
+AI_BATCH = 4096  # enemies per vectorized batch of turns (the ai_budget is checked between batches)
+
+
+def _num(value):
+    # Whole numbers as int (matches the dict engine's messages), fractions rounded
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 1)
+
+
+class SwarmEngine:
+    def __init__(self, encounter, player, rng=None, width=BATTLE_WIDTH, height=BATTLE_HEIGHT, loot_rng=None):
+        # 1) Same arguments as BattleEngine; needs NumPy.
+        # 2) Enemies are rows in parallel arrays: kind (index into type_names), x, y, hp, attack, defence, speed.
+        # 3) Per-type data (name, sprite, exp, drop) stays in small Python lists indexed by kind.
+        # 4) Footprint sizes are arrays too; `occupied` counts the living enemies covering each arena cell.
+        # 5) Movement follows the shared FlowField (see pathfinding.py), read as NumPy arrays per footprint size.
+        # 6) Enemy turns are scheduled per enemy like BattleEngine's AIScheduler, as arrays: `next_think` (next turn)
+        #    and `next_move` (next step, every MOVE_DELAY / speed); `ai_budget` caps real seconds of AI per tick.
+        if np is None:
+            raise RuntimeError("Swarm battles need NumPy (pip install numpy)")
+        self.encounter = ENCOUNTERS[encounter] if isinstance(encounter, str) else encounter
+        self.player = player
+        self.rng = rng or random.Random()
+        self.np_rng = np.random.default_rng(self.rng.getrandbits(64))
+        self.loot_np_rng = np.random.default_rng((loot_rng or self.rng).getrandbits(64))
+        self.width = width
+        self.height = height
+        self.player_pos = {'x': width // 2, 'y': height - 2}
+        self.obstacles = obstacle_cells(self.encounter, width, height)
+        self.field = FlowField(width, height, self.obstacles)
+        self._fields = {}
+        level = player.Level
+        self.types = []  # scaled template per kind
+        self.type_names = []
+        kinds, xs, ys = [], [], []
+        for spec in self.encounter['enemies']:
+            if spec['type'] not in self.type_names:
+                self.type_names.append(spec['type'])
+                self.types.append(spawn_enemy(spec['type'], level, 0, 0))
+            kind = self.type_names.index(spec['type'])
+            for x, y in spawn_positions(spec, self.player_pos, width, height, self.rng, self.obstacles):
+                kinds.append(kind)
+                xs.append(x)
+                ys.append(y)
+        self.kind = np.array(kinds, dtype=np.int32)
+        self.x = np.array(xs, dtype=np.int32)
+        self.y = np.array(ys, dtype=np.int32)
+        per_kind = lambda stat: np.array([t[stat] for t in self.types], dtype=np.float64)[self.kind]
+        self.hp = per_kind('HP')
+        self.attack = per_kind('attack')
+        self.defence = per_kind('defence')
+        self.speed = per_kind('speed').astype(np.int32)
+        self.size_w = per_kind('size_width').astype(np.int32)
+        self.size_h = per_kind('size_height').astype(np.int32)
+        self._occupied = None
+        self.think_interval = np.array([think_interval(t) for t in self.types], dtype=np.float64)[self.kind]
+        self.next_think = self.np_rng.random(self.kind.size) * self.think_interval
+        self.next_move = np.zeros(self.kind.size)
+        self.move_interval = np.where(self.speed > 0, MOVE_DELAY / np.maximum(self.speed, 1), np.inf)
+        self.ai_budget = None
+        self.time = 0.0
+        self.outcome = None
+        self.rewards = []
+
+    def alive_mask(self):
+        return self.hp > 0
+
+    def alive_enemies(self):
+        # Living enemies as dicts (for drawing and scripted policies; the simulation itself never builds them)
+        idx = np.flatnonzero(self.alive_mask())
+        enemies = []
+        for kind, x, y, hp in zip(self.kind[idx].tolist(), self.x[idx].tolist(), self.y[idx].tolist(), self.hp[idx].tolist()):
+            t = self.types[kind]
+            enemies.append({'name': t['name'], 'battle_x': x, 'battle_y': y, 'HP': hp, 'sprite': t['sprite'],
+                            'size_width': t['size_width'], 'size_height': t['size_height']})
+        return enemies
+
+    def _nearest(self):
+        # (index, distance) of the living enemy closest to the player, or (None, None)
+        idx = np.flatnonzero(self.alive_mask())
+        if not idx.size:
+            return None, None
+        dist = self._distances()[idx]
+        nearest = int(np.argmin(dist))
+        return idx[nearest], dist[nearest]
+
+    def nearest_enemy(self):
+        i, _ = self._nearest()
+        if i is None:
+            return None
+        t = self.types[self.kind[i]]
+        return {'name': t['name'], 'battle_x': int(self.x[i]), 'battle_y': int(self.y[i]), 'HP': float(self.hp[i]),
+                'size_width': t['size_width'], 'size_height': t['size_height']}
+
+    def _distances(self):
+        # Distance from the player to the closest cell of every enemy's footprint
+        px, py = self.player_pos['x'], self.player_pos['y']
+        dx = np.maximum(np.maximum(self.x - px, 0), px - (self.x + self.size_w - 1))
+        dy = np.maximum(np.maximum(self.y - py, 0), py - (self.y + self.size_h - 1))
+        return dx + dy
+
+    def occupied(self):
+        # (height, width) array of how many living enemies cover each cell; rebuilt only after enemies move or die
+        if self._occupied is None:
+            grid = np.zeros((self.height, self.width), dtype=np.int32)
+            alive = self.alive_mask()
+            for offset_y in range(int(self.size_h.max(initial=1))):
+                for offset_x in range(int(self.size_w.max(initial=1))):
+                    covers = alive & (self.size_w > offset_x) & (self.size_h > offset_y)
+                    cx, cy = self.x[covers] + offset_x, self.y[covers] + offset_y
+                    inside = (cx < self.width) & (cy < self.height)
+                    grid += np.bincount(cy[inside] * self.width + cx[inside],
+                                        minlength=self.width * self.height).reshape(self.height, self.width).astype(np.int32)
+            self._occupied = grid
+        return self._occupied
+
+    # --- Update ---
+    def tick(self, dt, actions=()):
+        # Same rules as BattleEngine.tick, applied to every enemy at once
+        events = []
+        if self.outcome is not None:
+            return events
+        dt = max(0.0, min(dt, MAX_TICK))
+        self.time += dt
+        for action in actions:
+            if action in MOVES:
+                self._move_player(action)
+            elif action == 'attack':
+                self._player_attack(events)
+        self._enemy_turn(events)
+        self._check_end(events)
+        return events
+
+    def _move_player(self, action):
+        dx, dy = MOVES[action]
+        pos = self.player_pos
+        nx = max(0, min(self.width - 1, pos['x'] + dx))
+        ny = max(0, min(self.height - 1, pos['y'] + dy))
+        if not self.occupied()[ny, nx] and (nx, ny) not in self.obstacles:
+            pos['x'], pos['y'] = nx, ny
+
+    def _player_attack(self, events):
+        i, dist = self._nearest()
+        if i is None:
+            return
+        if dist <= 1:
+            dmg = max(0, self.player.effective_attack - self.defence[i])
+            self.hp[i] -= dmg
+            if self.hp[i] <= 0:
+                self._occupied = None
+            events.append(('player_hit', f"You hit {self.type_names[self.kind[i]]} for {_num(dmg)}!"))
+        else:
+            events.append(('miss', "Enemy is too far to attack!"))
+
+    def _enemy_turn(self, events):
+        # Vectorized per-enemy turns: every enemy whose turn is due either rolls to hit (adjacent) or takes the
+        # flow-field steps its speed allows. With an `ai_budget`, turns run in batches of AI_BATCH, most overdue first,
+        # until none are due or the budget is spent; enemies left over go first next tick.
+        px, py = self.player_pos['x'], self.player_pos['y']
+        self.field.update(px, py)
+        hit_chance = self.encounter.get('hit_chance', 0.0)
+        deadline = None if self.ai_budget is None else time.perf_counter() + self.ai_budget
+        while True:
+            due = np.flatnonzero(self.alive_mask() & (self.next_think <= self.time))
+            if not due.size or (deadline is not None and time.perf_counter() >= deadline):
+                break
+            if deadline is not None and due.size > AI_BATCH:
+                due = due[np.argsort(self.next_think[due], kind='stable')[:AI_BATCH]]
+            near = self._distances()[due] <= 1
+            self._roll_hits(due[near], hit_chance, events)
+            movers = due[~near & (self.speed[due] > 0)]
+            self.next_move[movers] = np.maximum(self.next_move[movers], self.next_think[movers] - MOVE_DELAY)
+            stepping = movers[self.next_move[movers] <= self.next_think[movers]]
+            while stepping.size:
+                for size_w, size_h in set(zip(self.size_w[stepping].tolist(), self.size_h[stepping].tolist())):
+                    group = stepping[(self.size_w[stepping] == size_w) & (self.size_h[stepping] == size_h)]
+                    self._step(group, self._footprint_field(size_w, size_h))
+                self.next_move[stepping] += self.move_interval[stepping]
+                stepping = stepping[self.next_move[stepping] <= self.next_think[stepping]]
+            self.next_think[due] = np.maximum(self.next_think[due] + self.think_interval[due], self.time - MAX_TICK)
+
+    def _roll_hits(self, adjacent, hit_chance, events):
+        # One hit roll per adjacent enemy, reported as a single message
+        if not adjacent.size:
+            return
+        hits = adjacent[self.np_rng.random(adjacent.size) < hit_chance]
+        if not hits.size:
+            return
+        damage = np.maximum(0, self.attack[hits] - self.player.effective_defence)
+        total = _num(damage.sum())
+        self.player.HP -= total
+        if hits.size == 1:
+            events.append(('enemy_hit', f"{self.type_names[self.kind[hits[0]]]} hits you for {total}!"))
+        else:
+            events.append(('enemy_hit', f"{hits.size} enemies hit you for {total}!"))
+
+    def _footprint_field(self, size_w, size_h):
+        # Flow-field distances for anchors of one enemy size, as a (height + 2, width + 2) array: the arena plus a
+        # one-cell UNREACHABLE border, so neighbour lookups in _step can index anchor (x, y) at [y + 1, x + 1] unclipped
+        key = (self.field.target, size_w, size_h)
+        field = self._fields.get(key)
+        if field is None:
+            if len(self._fields) > 8:
+                self._fields.clear()
+            if self.field.open:
+                # No obstacles: Manhattan distance from each anchor's footprint to the target
+                tx, ty = self.field.target
+                ys, xs = np.mgrid[0:self.height, 0:self.width]
+                dx = np.maximum(np.maximum(xs - tx, 0), tx - (xs + size_w - 1))
+                dy = np.maximum(np.maximum(ys - ty, 0), ty - (ys + size_h - 1))
+                field = np.where((xs > self.width - size_w) | (ys > self.height - size_h), UNREACHABLE, dx + dy)
+            else:
+                field = np.array(self.field.distances(size_w, size_h), dtype=np.int64).reshape(self.height, self.width)
+            field = np.pad(field, 1, constant_values=UNREACHABLE)
+            self._fields[key] = field
+        return field
+
+    def _step(self, idx, field):
+        # Move enemies `idx` one step down the (bordered) field; a target cell already taken (or claimed by an earlier mover) blocks
+        if not idx.size:
+            return
+        width = self.width
+        occupied = np.pad(self.occupied(), 1, constant_values=1)
+        x, y = self.x[idx] + 1, self.y[idx] + 1  # bordered coordinates
+        best = field[y, x]
+        bx, by = x.copy(), y.copy()
+        for dx, dy in STEPS:
+            nx, ny = x + dx, y + dy
+            d = field[ny, nx]
+            ok = (d < best) & (d > 0) & (occupied[ny, nx] == 0)
+            if dx and dy:
+                ok &= (field[y, nx] != UNREACHABLE) & (field[ny, x] != UNREACHABLE)
+            best = np.where(ok, d, best)
+            bx = np.where(ok, nx, bx)
+            by = np.where(ok, ny, by)
+        movers = np.flatnonzero((bx != x) | (by != y))
+        if not movers.size:
+            return
+        _, first = np.unique(by[movers] * (width + 2) + bx[movers], return_index=True)
+        keep = movers[first]
+        self.x[idx[keep]] = bx[keep] - 1
+        self.y[idx[keep]] = by[keep] - 1
+        self._occupied = None
+
+    def _check_end(self, events):
+        if not np.any(self.alive_mask()):
+            self.outcome = 'victory'
+            self.rewards = [self._roll_rewards(kind) for kind in range(len(self.types))]
+            events.append(('victory', self.encounter.get('victory', 'You won the battle!')))
+        elif self.player.HP <= 0:
+            self.outcome = 'defeat'
+            events.append(('defeat', 'You died...'))
+
+    def _roll_rewards(self, kind):
+        # One (name, exp, drop, count) entry per enemy type, with all of its drops rolled at once
+        t = self.types[kind]
+        count = int(np.count_nonzero(self.kind == kind))
+        name = t['name'] if count == 1 else f"{count} x {t['name']}"
+        drops = 0
+        if t.get('drop'):
+            drops = int(np.count_nonzero(self.loot_np_rng.random(count) < drop_probability(t.get('drop_chance', 50))))
+        return name, t.get('exp', 0) * count, t.get('drop') if drops else None, drops
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Smoke tests for the game engine pieces that don't need a terminal.
+
+Run directly (python test_engine.py) or with pytest. Frames are checked through CaptureRenderer.
+"""
+import io
+import random
+from collections import Counter
+
+from encounters import AliasTable
+from map_compiler import load_world
+from pathfinding import FlowField, UNREACHABLE
+from player import PlayerStats, exp_needed_for_level, level_for_exp
+from recording import apply_edits
+from renderer import CaptureRenderer
+from screen import ScreenBuffer, diff_rows
+import main
+
+
+def _random_frame(rng):
+    return ["".join(rng.choice("ab ⣿") for _ in range(rng.randint(0, 30))) for _ in range(rng.randint(0, 12))]
+
+
+def test_diff_rows_round_trip():
+    # Applying the edits between two frames to the first one must give the second
+    rng = random.Random(1)
+    old = _random_frame(rng)
+    for _ in range(500):
+        new = _random_frame(rng)
+        assert apply_edits(old, len(new), list(diff_rows(old, new))) == new
+        old = new
+
+
+def test_screen_buffer_skips_unchanged_frames():
+    stream = io.StringIO()
+    screen = ScreenBuffer(stream)
+    first = screen.present(["hello", "world"])
+    assert screen.present(["hello", "world"]) < first
+    screen.invalidate()
+    assert screen.present(["hello", "world"]) >= first
+
+
+def test_alias_table_distribution():
+    outcomes = ['a', 'b', 'c', None]
+    weights = [5, 3, 1, 1]
+    table = AliasTable(outcomes, weights)
+    rng = random.Random(7)
+    counts = Counter(table.sample(rng) for _ in range(50000))
+    for outcome, weight in zip(outcomes, weights):
+        assert abs(counts[outcome] / 50000 - weight / 10) < 0.01
+
+
+def test_level_for_exp_matches_thresholds():
+    # The bisect over the cached table agrees with walking the levels one by one
+    for exp in list(range(0, 5000, 37)) + [10 ** 6, 10 ** 12]:
+        level = 1
+        while exp_needed_for_level(level + 1) <= exp:
+            level += 1
+        assert level_for_exp(exp) == level
+
+
+def test_flow_field_paths_around_a_wall():
+    # A wall with one gap: the distance goes through the gap and stepping along the field ends next to the target
+    wall = {(5, y) for y in range(10) if y != 8}
+    field = FlowField(10, 10, wall)
+    field.update(9, 0)
+    assert field.distance(5, 0) == UNREACHABLE
+    x, y = 0, 0
+    for _ in range(40):
+        if field.distance(x, y) <= 1:
+            break
+        x, y = field.next_step(x, y)
+        assert (x, y) not in wall
+    assert field.distance(x, y) == 1
+
+
+def test_render_map_frame():
+    # The field frame has the player marker, the stats line and the logged messages
+    capture = CaptureRenderer()
+    previous = main.set_renderer(capture)
+    try:
+        map_data, tiles, _ = load_world("map1")
+        stats = PlayerStats(HP=50, max_hp=120)
+        main.MESSAGES.clear()
+        main.MESSAGES.add("Hello from the log")
+        main.render_map(map_data, 40, 30, stats, camera=False)
+        frame = capture.last_frame
+        assert frame[30][40] == "⇩"
+        assert "[Level 1 | HP 50/120 | EXP 0/120]" in frame
+        assert "Hello from the log" in frame
+    finally:
+        main.MESSAGES.clear()
+        main.set_renderer(previous)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✓ {name}")
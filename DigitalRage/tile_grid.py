@@ -0,0 +1,68 @@
+# tile_grid.py
+# Compact tile layer: one byte per map cell holding a small tile code instead of a dict per tile.
+
+# Code <-> name table. Code 0 is "empty" so a fresh grid is all passable floor.
+TILE_NAMES = ["empty", "wall", "chest", "NPC", "door", "boss", "blocked"]
+TILE_CODES = {name: code for code, name in enumerate(TILE_NAMES)}
+
+# Map characters that place a tile (used when scanning map rows)
+TILE_CHARS = {'#': "wall", 'C': "chest", 'N': "NPC", 'D': "door", '@': "boss"}
+
+
+class TileGrid:
+    # --- Basic setup ---
+    def __init__(self, width, height, cells=None):
+        # 1) Store the map size; cells are laid out row by row (index = y * width + x).
+        # 2) Use the given buffer (bytearray, memoryview, mmap...) or allocate width*height zero bytes.
+        self.width = width
+        self.height = height
+        self.cells = cells if cells is not None else bytearray(width * height)
+
+    @classmethod
+    def from_map(cls, rows):
+        # 1) Size the grid from the map rows (width = longest row, rows can be ragged).
+        # 2) Set a tile code for every character listed in TILE_CHARS; everything else stays empty.
+        height = len(rows)
+        width = max((len(row) for row in rows), default=0)
+        grid = cls(width, height)
+        for y, row in enumerate(rows):
+            for x, ch in enumerate(row):
+                name = TILE_CHARS.get(ch)
+                if name:
+                    grid.cells[y * width + x] = TILE_CODES[name]
+        return grid
+
+    # --- Cell access ---
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get(self, x, y):
+        # Return the tile name at (x, y); cells outside the map read as "empty" like the old tile list
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return TILE_NAMES[self.cells[y * self.width + x]]
+        return "empty"
+
+    def set(self, x, y, tile_id):
+        # Store a tile name at (x, y); unknown names raise KeyError, out of range raises IndexError
+        if not self.in_bounds(x, y):
+            raise IndexError(f"tile ({x}, {y}) outside {self.width}x{self.height} grid")
+        self.cells[y * self.width + x] = TILE_CODES[tile_id]
+
+    def clear(self, x, y):
+        if self.in_bounds(x, y):
+            self.cells[y * self.width + x] = 0
+
+    # --- Conversion ---
+    def tiles(self):
+        # Yield every non-empty cell in the old {'id', 'x', 'y'} dict shape
+        width = self.width
+        for index, code in enumerate(self.cells):
+            if code:
+                yield {'id': TILE_NAMES[code], 'x': index % width, 'y': index // width}
+
+    def to_json(self):
+        # Serialize to the existing save shape (list of tile dicts)
+        return list(self.tiles())
+
+    def __repr__(self):
+        return f"TileGrid({self.width}x{self.height})"
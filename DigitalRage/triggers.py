@@ -0,0 +1,68 @@
+# triggers.py
+# Declarative boss triggers: an enemy template lists one-shot triggers, each with a condition and effects, e.g.
+#   {'hp_below': 0.25, 'attack': 20, 'message': 'Phase 2!', 'music': 'final2'}
+# Conditions (one per trigger):
+#   hp_below: fraction of max HP   -> checked only when that enemy takes damage
+#   after:    seconds of battle    -> kept in a heap by due time, so each tick only looks at the earliest one
+#   player_in: (left, top, right, bottom) arena rectangle -> checked only when the player moves
+# Effects (applied by the battle engine): add 'attack' / 'defence' / 'speed', advance the enemy's phase,
+# show 'message', switch to 'music'.
+import heapq
+import itertools
+
+BOOST_STATS = ('attack', 'defence', 'speed')
+
+
+class TriggerSet:
+    def __init__(self):
+        # hp: id(enemy) -> [(fraction, enemy, trigger)], highest fraction first
+        # timed: heap of (time, order, enemy, trigger); areas: [(rect, enemy, trigger)]
+        self.hp = {}
+        self.timed = []
+        self.areas = []
+        self.order = itertools.count()
+
+    def add(self, enemy, trigger):
+        if 'hp_below' in trigger:
+            pending = self.hp.setdefault(id(enemy), [])
+            pending.append((trigger['hp_below'], enemy, trigger))
+            pending.sort(key=lambda entry: -entry[0])
+        elif 'after' in trigger:
+            heapq.heappush(self.timed, (trigger['after'], next(self.order), enemy, trigger))
+        elif 'player_in' in trigger:
+            self.areas.append((trigger['player_in'], enemy, trigger))
+        else:
+            raise ValueError(f"trigger has no condition: {trigger}")
+
+    # --- Watched values changed; each returns the (enemy, trigger) pairs that fire, and forgets them ---
+    def damaged(self, enemy):
+        # `enemy` just lost HP: fire every threshold it has fallen through (none once it is dead)
+        pending = self.hp.get(id(enemy))
+        fired = []
+        while pending and enemy['HP'] <= enemy['max_HP'] * pending[0][0]:
+            _, _, trigger = pending.pop(0)
+            if enemy['HP'] > 0:
+                fired.append((enemy, trigger))
+        return fired
+
+    def elapsed(self, now):
+        # Battle time moved on to `now`
+        fired = []
+        while self.timed and self.timed[0][0] <= now:
+            _, _, enemy, trigger = heapq.heappop(self.timed)
+            if enemy['HP'] > 0:
+                fired.append((enemy, trigger))
+        return fired
+
+    def moved(self, x, y):
+        # The player stepped to (x, y)
+        if not self.areas:
+            return []
+        fired = []
+        for entry in list(self.areas):
+            (left, top, right, bottom), enemy, trigger = entry
+            if left <= x < right and top <= y < bottom:
+                self.areas.remove(entry)
+                if enemy['HP'] > 0:
+                    fired.append((enemy, trigger))
+        return fired